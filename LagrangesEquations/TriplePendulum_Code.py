@@ -1,30 +1,46 @@
-import matplotlib.pyplot as plt
-from matplotlib import animation
-from matplotlib import collections
-
 import numpy as np
 
-from sympy import *
-import sympy as sp
-from sympy import symbols
-from sympy.physics import mechanics
-from sympy import Dummy, lambdify
-from sympy import Derivative
+import os
+import pickle
+from importlib.metadata import version
 
-from scipy.integrate import odeint
+# matplotlib, sympy, scipy and IPython are slow to import, so each of them is imported inside the functions using it:
+# a compute-only run never loads the plotting, symbolic or notebook packages it does not need
 
-from IPython.display import HTML
 
 
+#-------------------------------------------------
+# DERIVATION CACHE
 
-# n -> number of segments
-# times -> time instants for the integration of the system
-# initial_positions -> initial positions of all (or each, if list) segments IN DEGREES
-# initial_velocities -> initial velocities of all (or each, if list) segments IN DEGREES
-# lenghts -> lenght of each segment
-# masses -> mass of each point
-def integrate_pendulum(n, times, initial_positions=135, initial_velocities=0, lengths=None, masses=1):
-    """Integrate the equations of motion of a pendulum made of n segments"""
+# The symbolic derivation of the equations of motion only depends on the number of segments,
+# so it is done once per n and cached in memory and on disk (as pickled sympy expressions)
+
+# Version of the cached files, to be increased whenever the derivation changes
+CACHE_FORMAT = 2
+
+# Directory holding the cached derivations, it can be changed with the PENDULUM_CACHE_DIR environment variable
+CACHE_DIR = os.environ.get('PENDULUM_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'triplePendulum'))
+
+# In memory cache: n -> (mm_func, fo_func)
+derivation_cache = {}
+
+# Hit/miss statistics of the cache
+cache_stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+
+def cache_path(n):
+    """Path of the cached derivation of a pendulum made of n segments"""
+
+    # The sympy version is part of the key, since pickled expressions are not portable across versions
+    return os.path.join(CACHE_DIR, 'lagrange_n{0}_sympy{1}_v{2}.pkl'.format(n, version('sympy'), CACHE_FORMAT))
+
+
+def derive_pendulum(n):
+    """Derive the symbolic mass matrix and forcing of a pendulum made of n segments"""
+
+    import sympy as sp
+    from sympy import symbols, Dummy
+    from sympy.physics import mechanics
 
     #-------------------------------------------------
     # PENDULUM MODEL
@@ -89,7 +105,132 @@ def integrate_pendulum(n, times, initial_positions=135, initial_velocities=0, le
     L = mechanics.Lagrangian(K, *particles)
     LM = mechanics.LagrangesMethod(L, q)
     eq = LM.form_lagranges_equations()
-    
+
+    # Fixed parameters: gravitational constant, lengths, and masses
+    parameters = [g] + list(l) + list(m)
+
+    dq = []
+    for i in range(n):
+        dq.append(q[i].diff(t))
+
+    d = dict(zip(dq, u))
+
+    # Replace the time dependent coordinates with plain symbols
+    unknowns = [Dummy() for i in q + u]
+    unknown_dict = dict(zip(q + u, unknowns))
+
+    # Only the n x n mass matrix and forcing of the accelerations are kept:
+    # the full 2n x 2n system is just this block plus the identity dq/dt = u
+    mm_sym = LM.mass_matrix.subs(d).subs(unknown_dict)
+    fo_sym = LM.forcing.subs(d).subs(unknown_dict)
+
+    return unknowns, parameters, mm_sym, fo_sym
+
+
+def load_pendulum(n):
+    """Get the lambdified mass matrix and forcing functions of a pendulum made of n segments, from the cache if possible"""
+
+    # Look in the memory cache
+    if n in derivation_cache:
+        cache_stats['memory_hits'] += 1
+        return derivation_cache[n]
+
+    path = cache_path(n)
+    derivation = None
+
+    # Look in the disk cache, an unreadable file is discarded and derived again
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as file:
+                derivation = pickle.load(file)
+            cache_stats['disk_hits'] += 1
+        except Exception:
+            os.remove(path)
+
+    # Derive the equations and store them on disk
+    # (written to a temporary file first, so that an interrupted run never leaves a truncated cache file)
+    if derivation is None:
+        cache_stats['misses'] += 1
+        derivation = derive_pendulum(n)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as file:
+            pickle.dump(derivation, file)
+        os.replace(tmp, path)
+
+    # Lambdify the mass matrix and the forcing
+    from sympy import lambdify
+    unknowns, parameters, mm_sym, fo_sym = derivation
+    mm_func = lambdify(unknowns + parameters, mm_sym)
+    fo_func = lambdify(unknowns + parameters, fo_sym)
+
+    derivation_cache[n] = (mm_func, fo_func)
+    return mm_func, fo_func
+
+
+def clear_pendulum_cache(disk=False):
+    """Empty the memory cache (and the disk cache if disk=True) and reset the statistics"""
+
+    derivation_cache.clear()
+
+    if disk and os.path.isdir(CACHE_DIR):
+        for name in os.listdir(CACHE_DIR):
+            if name.startswith('lagrange_n'):
+                os.remove(os.path.join(CACHE_DIR, name))
+
+    for key in cache_stats:
+        cache_stats[key] = 0
+
+
+
+def chain_accelerations(theta, omega, lengths, masses, g=9.81):
+    """Angular accelerations of a chain of point masses, in O(n) operations through the tensions of the ropes"""
+
+    # Each mass k feels the tension T_k of its rope (pulling towards the previous mass) and T_{k+1} of the next rope.
+    # Since the ropes are rigid, the acceleration of mass k relative to mass k-1 along rope k is -l_k * omega_k^2:
+    # writing this constraint for every rope gives a symmetric TRIDIAGONAL system for the tensions,
+    # coupling each rope only to its neighbours through the cosine of the angle between them.
+    from scipy.linalg import solve_banded
+    n = len(theta)
+    cos_next = np.cos(np.diff(theta))
+    sin_next = np.sin(np.diff(theta))
+    inv_m = 1 / masses
+
+    # Diagonal, off-diagonal and right hand side of the tension system
+    diag = -inv_m.copy()
+    diag[1:] -= inv_m[:-1]
+    off = cos_next * inv_m[:-1]
+    rhs = -lengths * omega**2
+    rhs[0] -= g * np.cos(theta[0])
+
+    # Solve the tridiagonal system (banded storage: upper diagonal, diagonal, lower diagonal)
+    bands = np.zeros((3, n))
+    bands[0, 1:] = off
+    bands[1] = diag
+    bands[2, :-1] = off
+    tension = solve_banded((1, 1), bands, rhs)
+
+    # Acceleration of mass k relative to mass k-1 perpendicular to rope k gives the angular acceleration
+    torque = np.zeros(n)
+    torque[:-1] += tension[1:] * sin_next * inv_m[:-1]
+    torque[1:] -= tension[:-1] * sin_next * inv_m[:-1]
+    torque[0] -= g * np.sin(theta[0])
+
+    return torque / lengths
+
+
+
+# n -> number of segments
+# times -> time instants for the integration of the system
+# initial_positions -> initial positions of all (or each, if list) segments IN DEGREES
+# initial_velocities -> initial velocities of all (or each, if list) segments IN DEGREES
+# lenghts -> lenght of each segment
+# masses -> mass of each point
+# method -> 'tridiagonal' (O(n) solution through the rope tensions) or 'cholesky' (symbolic mass matrix and forcing)
+def integrate_pendulum(n, times, initial_positions=135, initial_velocities=0, lengths=None, masses=1, method='tridiagonal'):
+    """Integrate the equations of motion of a pendulum made of n segments"""
+
+    from scipy.integrate import odeint
 
     #-----------------------------------------------------
     # NUMERICAL INTEGRATION
@@ -105,37 +246,45 @@ def integrate_pendulum(n, times, initial_positions=135, initial_velocities=0, le
     lengths = np.broadcast_to(lengths, n)
     masses = np.broadcast_to(masses, n)
 
-    # Set fixed parameters: gravitational constant, lengths, and masses
-    parameters = [g] + list(l) + list(m)
-    parameter_vals = [9.81] + list(lengths) + list(masses)
+    # Solution through the rope tensions: no symbolic derivation and linear cost in the number of segments
+    if method == 'tridiagonal':
 
-    dq = []
-    for i in range(n):
-        dq.append(q[i].diff(t))
+        lengths = np.asarray(lengths, dtype=float)
+        masses = np.asarray(masses, dtype=float)
 
-    d = dict(zip(dq, u))
+        def gradient(y, t):
+            return np.concatenate((y[n:], chain_accelerations(y[:n], y[n:], lengths, masses)))
 
-    unknowns = [Dummy() for i in q + u]
-    unknown_dict = dict(zip(q + u, unknowns))
+        # ODE integration
+        return odeint(gradient, y0, times)
 
-    mm_sym = LM.mass_matrix_full.subs(d).subs(unknown_dict)
-    fo_sym = LM.forcing_full.subs(d).subs(unknown_dict)
-    mm_func = lambdify(unknowns + parameters, mm_sym)
-    fo_func = lambdify(unknowns + parameters, fo_sym)
+    # Lambdified mass matrix and forcing (derived once per number of segments)
+    from scipy.linalg import cho_factor, cho_solve
+    mm_func, fo_func = load_pendulum(n)
+
+    # Set fixed parameters values: gravitational constant, lengths, and masses
+    parameter_vals = [9.81] + list(lengths) + list(masses)
 
     # Function which computes the derivatives of parameters
     # Needed for integrating the ODEs 
     def gradient(y, t, args):
         vals = np.concatenate((y, args))
-        sol = np.linalg.solve(mm_func(*vals), fo_func(*vals))
-        return np.array(sol).T[0]
+        dy = np.empty(2*n)
+
+        # The derivatives of the angles are the angular velocities
+        dy[:n] = y[n:]
+
+        # The accelerations solve M(q) du/dt = f(q, u): the mass matrix of the chain is symmetric positive definite,
+        # so it is solved with a Cholesky factorization instead of a general dense solve
+        dy[n:] = cho_solve(cho_factor(mm_func(*vals)), np.ravel(fo_func(*vals)))
+        return dy
 
     # ODE integration
     return odeint(gradient, y0, times, args=(parameter_vals,))
 
 
 
-def get_xy_coords(p, lengths=None):
+def get_xy_coords(p, lengths=None, chunk=None, out=None):
     """Get (x, y) coordinates from generalized coordinates"""
 
     # Make the coordinates a 2D array
@@ -147,23 +296,41 @@ def get_xy_coords(p, lengths=None):
     if lengths is None:
         lengths = np.ones(n) / n
 
-    # Make some zero values to fill all the non-used entries in the following arrays
-    zeros = np.zeros(p.shape[0])[:, None]
+    lengths = np.broadcast_to(np.asarray(lengths, dtype=float), n)
 
-    # "hstack" stacks arrays in sequence horizontally (column wise)
-    # which means we get arrays of x and y coordinates
-    # each array of size n
-    x = np.hstack([zeros, lengths * np.sin(p[:, :n])])
-    y = np.hstack([zeros, -1 * lengths * np.cos(p[:, :n])])
+    # The x and y arrays hold the fixed point (first column, always zero) and the n mass points:
+    # they are written in place (into 'out' if given, an array of shape (2, len(p), n+1)),
+    # 'chunk' samples at a time, so that no temporary array is as large as the whole trajectory
+    if out is None:
+        out = np.empty((2, p.shape[0], n + 1))
+    x, y = out
+    x[:, 0] = 0
+    y[:, 0] = 0
 
-    # we return the cumulative sum of entries in axis 1 -> zeros + projected position of each mass point
-    return np.cumsum(x, 1), np.cumsum(y, 1)
+    chunk = chunk or max(p.shape[0], 1)
+    for start in range(0, p.shape[0], chunk):
+        rows = slice(start, start + chunk)
+
+        # Projected position of each mass point relative to the previous one
+        np.sin(p[rows, :n], out=x[rows, 1:])
+        np.cos(p[rows, :n], out=y[rows, 1:])
+        x[rows, 1:] *= lengths
+        y[rows, 1:] *= -lengths
+
+        # Cumulative sum along the chain -> position of each mass point
+        for k in range(2, n + 1):
+            x[rows, k] += x[rows, k-1]
+            y[rows, k] += y[rows, k-1]
+
+    return x, y
 
 
 
 def make_plot(x, y):
     """Make the plot of trajectories"""
 
+    import matplotlib.pyplot as plt
+
     # Make figure and axes
     fig = plt.figure( figsize=(6, 6) )
     ax = fig.add_subplot(1, 1, 1)
@@ -216,6 +383,10 @@ def make_plot(x, y):
 def animate_pendulums(n, times, initial_positions, initial_velocities, lengths, masses, n_pendulums=1, perturbation=0, track_length=15):
     """Make the animation of 'n_pendulums' pendulums"""
 
+    import matplotlib.pyplot as plt
+    from matplotlib import animation
+    from matplotlib import collections
+
     const = 3
     track_length *= const
     
@@ -289,4 +460,13 @@ def animate_pendulums(n, times, initial_positions, initial_velocities, lengths,
     anim = animation.FuncAnimation(fig, animate, frames=len(times) // const,interval=interval, blit=True, init_func=init)
     
     plt.close(fig)
-    return anim
\ No newline at end of file
+    return anim
+
+
+
+def show_animation(anim):
+    """Embed an animation made by animate_pendulums in a notebook as an HTML5 video"""
+
+    from IPython.display import HTML
+
+    return HTML(anim.to_html5_video())
@@ -15,6 +15,7 @@
 from simplePendulum import simplePendulum
 from doublePendulum import doublePendulum
 from triplePendulum import triplePendulum
+from solvers import SOLVERS
 
 
 def main():
@@ -31,15 +32,21 @@ def main():
     except ValueError:
         print('\nMust be a number')
 
+    # Let the user choose the integration method, Runge-Kutta 4 is used if nothing is inserted
+    print('\nChoose the solver (press enter for the default rk4):')
+    for name, description in SOLVERS.items():
+        print('Insert "%s" for %s' % (name, description))
+    solver = str(input('\n')) or 'rk4'
+
     # Enter the appropriate function
     if n == 1:
-        simplePendulum(n)
+        simplePendulum(n, solver)
     
     elif n == 2:
-        doublePendulum(n)
+        doublePendulum(n, solver)
 
     elif n == 3:
-        triplePendulum(n)
+        triplePendulum(n, solver)
 
     else:
         print('Not supported')
@@ -16,7 +16,17 @@ import numpy as np
 import matplotlib.pyplot as plt 
 from matplotlib import animation
 
+# Custom made module
+from profiling import profiled
 
+
+def history(a, i):
+    '''First i samples of a trajectory: the lazy arrays of a stored run read only the samples added since the previous frame'''
+
+    return a.head(i) if hasattr(a, 'head') else a[:i]
+
+
+@profiled('animationModule.simplePendulumTrend')
 def simplePendulumTrend(i, s, t, q, lines):
     ''''Animate coordinate trends over time for a simple pendulum'''
 
@@ -26,15 +36,16 @@ def simplePendulumTrend(i, s, t, q, lines):
     # If the line refers to the angle
     if s == 'theta':  
         # Set new data for each iteration
-        line1.set_data(t[:i], q[:i, 0])
+        line1.set_data(history(t, i), history(q, i)[:, 0])
     
     # If the line refers to the velocity
     elif s == 'omega':
         # Set new data for each iteration
-        line1.set_data(t[:i], q[:i, 1])
+        line1.set_data(history(t, i), history(q, i)[:, 1])
 
     return line1,
 
+@profiled('animationModule.doublePendulumTrend')
 def doublePendulumTrend(i, s, t, q, lines):
     '''Animate coordinate trends over time for a double pendulum'''
 
@@ -44,17 +55,18 @@ def doublePendulumTrend(i, s, t, q, lines):
     # If the line refers to the angle
     if s == 'theta':  
         # Set new data for each iteration
-        line1.set_data(t[:i], q[:i, 0])
-        line2.set_data(t[:i], q[:i, 2])
+        line1.set_data(history(t, i), history(q, i)[:, 0])
+        line2.set_data(history(t, i), history(q, i)[:, 2])
     
     # If the line refers to the velocity
     elif s == 'omega':
         # Set new data for each iteration
-        line1.set_data(t[:i], q[:i, 1])
-        line2.set_data(t[:i], q[:i, 3])
+        line1.set_data(history(t, i), history(q, i)[:, 1])
+        line2.set_data(history(t, i), history(q, i)[:, 3])
 
     return line1, line2,
 
+@profiled('animationModule.triplePendulumTrend')
 def triplePendulumTrend(i, s, t, q, lines):
     '''Animate coordinate trends over time for a triple pendulum'''
 
@@ -64,19 +76,20 @@ def triplePendulumTrend(i, s, t, q, lines):
     # If the line refers to the angle
     if s == 'theta':  
         # Set new data for each iteration
-        line1.set_data(t[:i], q[:i, 0])
-        line2.set_data(t[:i], q[:i, 2])
-        line3.set_data(t[:i], q[:i, 4])
+        line1.set_data(history(t, i), history(q, i)[:, 0])
+        line2.set_data(history(t, i), history(q, i)[:, 2])
+        line3.set_data(history(t, i), history(q, i)[:, 4])
     
     # If the line refers to the velocity
     elif s == 'omega':
         # Set new data for each iteration
-        line1.set_data(t[:i], q[:i, 1])
-        line2.set_data(t[:i], q[:i, 3])
-        line3.set_data(t[:i], q[:i, 5])
+        line1.set_data(history(t, i), history(q, i)[:, 1])
+        line2.set_data(history(t, i), history(q, i)[:, 3])
+        line3.set_data(history(t, i), history(q, i)[:, 5])
 
     return line1, line2, line3,
 
+@profiled('animationModule.simplePendulumAnimation')
 def simplePendulumAnimation(i, x, y, traces, masses, segments, texts, T, h):
     '''Animate the simple pendulum'''
 
@@ -115,6 +128,7 @@ def simplePendulumAnimation(i, x, y, traces, masses, segments, texts, T, h):
 
     return trace1, mass0, mass1, segments, time_text, totalEnergy_text,
 
+@profiled('animationModule.doublePendulumAnimation')
 def doublePendulumAnimation(i, x, y, traces, masses, segments, texts, T, h):
     '''Animate the double pendulum'''
 
@@ -157,6 +171,7 @@ def doublePendulumAnimation(i, x, y, traces, masses, segments, texts, T, h):
 
     return trace1, trace2, mass0, mass1, mass2, segments, time_text, totalEnergy_text,
 
+@profiled('animationModule.triplePendulumAnimation')
 def triplePendulumAnimation(i, x, y, traces, masses, segments, texts, T, h):
     '''Animate the triple pendulum'''
 
@@ -204,18 +219,74 @@ def triplePendulumAnimation(i, x, y, traces, masses, segments, texts, T, h):
     return trace1, trace2, trace3, mass0, mass1, mass2, mass3, segments, time_text, totalEnergy_text,
 
 
-def kineticEnergyAnimation(i, ax, E, U):
+def energyBar(ax, color):
+    '''Creates an energy bar as a single rectangle of zero height in the axis ax, its height is then updated at each frame'''
+
+    bar = plt.Rectangle((0, 0), 1, 0, color = color)
+    ax.add_patch(bar)
+
+    return bar
+
+def energyScale(E, U):
+    '''Normalization constant of the energy bars, computed once for the whole trajectory'''
+
+    return 1 / (np.abs(np.amax(E)) + np.abs(np.amax(U)))
+
+@profiled('animationModule.kineticEnergyAnimation')
+def kineticEnergyAnimation(i, bar, E, scale):
     '''Animate the kinetic energy bar'''
 
-    # Fill the bar with the kinetic energy
-    rect1 = ax.fill_between(x = (0, 1), y1 = 0, y2 = E[i] / (np.abs(np.amax(E))+np.abs(np.amax(U))), color = 'red')
+    # Set the height of the bar to the normalized kinetic energy
+    bar.set_height(E[i] * scale)
 
-    return rect1,
+    return bar,
 
-def potentialEnergyAnimation(i, ax, E, U):
+@profiled('animationModule.potentialEnergyAnimation')
+def potentialEnergyAnimation(i, bar, U, scale):
     '''Animate the potential energy bar'''
 
-    # Fill the bar with the potential energy
-    rect2 = ax.fill_between(x = (0, 1), y1 = 0, y2 = U[i] / (np.abs(np.amax(E))+np.abs(np.amax(U))), color = 'blue')
+    # Set the height of the bar to the normalized potential energy
+    bar.set_height(U[i] * scale)
+
+    return bar,
+
+
+class PendulumAnimator:
+    '''Single animation controller of a figure: it owns the update functions of all the panels (pendulum, trends, energy bars)
+    and calls them from one callback, so that the figure is blitted once per frame.
+    Frames are skipped to play the simulation in real time at the target fps: each frame advances max(1, 1/(fps*h)) time steps'''
+
+    def __init__(self, fig, nframes, h, fps=30):
+        self.fig = fig
+        self.nframes = nframes
+        self.h = h
+        self.fps = fps
+
+        # Update functions of the panels with their extra arguments
+        self.panels = []
+
+        # Time steps advanced at each frame
+        self.stride = max(1, int(round(1 / (fps*h))))
+
+    def add(self, update, *fargs):
+        '''Adds a panel: update(i, *fargs) updates its artists to the time step i and returns them'''
+
+        self.panels.append((update, fargs))
+
+    @profiled('animationModule.PendulumAnimator.update')
+    def update(self, i):
+        '''Updates all the panels to the time step i, returns all the artists to blit'''
+
+        artists = []
+        for update, fargs in self.panels:
+            artists.extend(update(i, *fargs))
+
+        return artists
+
+    def start(self):
+        '''Creates the animation, which must be kept referenced until the figure is shown'''
+
+        self.animation = animation.FuncAnimation(self.fig, self.update, frames=range(0, self.nframes, self.stride),
+                                                 interval=1000*self.stride*self.h, blit=True)
 
-    return rect2,
\ No newline at end of file
+        return self.animation
@@ -0,0 +1,242 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    BATCH RUN MODULE
+
+    The following code runs a simulation without any interaction, reading the parameters from a config file (TOML or JSON)
+    and from the command line, so that it can be used by batch schedulers. Matplotlib is imported only if a plot is requested
+"""
+
+# Python modules
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# Custom made modules
+from solvers import solveMotion, SOLVERS
+from equationsMotion import simplePendulumEq, doublePendulumEq, triplePendulumEq
+from computeEnergy import simplePendulumEnergy, doublePendulumEnergy, triplePendulumEnergy
+from computeCoordinates import computeCoordinates
+import profiling
+
+
+# Equations of motion and energy of each system
+EQUATIONS = {1: simplePendulumEq, 2: doublePendulumEq, 3: triplePendulumEq}
+ENERGIES = {1: simplePendulumEnergy, 2: doublePendulumEnergy, 3: triplePendulumEnergy}
+
+# Default configuration, the same default parameters of the interactive simulations
+DEFAULTS = {
+    'system': 3,
+    'masses': 1.0,
+    'lengths': 1.0,
+    'theta': 135.0,
+    'omega': 0.0,
+    't0': 0,
+    'tf': 10,
+    'nstep': 1000,
+    'solver': 'rk4',
+    'output': {}
+    }
+
+# Outputs which can be requested
+OUTPUTS = ('npz', 'store', 'plot')
+
+# Colours of the trajectories of the masses, as in the interactive simulations
+COLORS = ['#047FFF', '#FF4B00', '#00C415']
+
+
+def readConfig(fname):
+    '''Reads a config file, in TOML format if its extension is .toml and in JSON format otherwise'''
+
+    if fname.endswith('.toml'):
+        import tomllib
+        with open(fname, 'rb') as file:
+            return tomllib.load(file)
+
+    with open(fname) as file:
+        return json.load(file)
+
+
+def perSegment(value, n, name):
+    '''Expands a number to one value per segment, checking the length of the lists'''
+
+    values = np.broadcast_to(np.asarray(value, dtype=float), (n,)) if np.ndim(value) == 0 else np.asarray(value, dtype=float)
+    if values.shape != (n,):
+        raise ValueError('"%s" must hold %d values, got %d' % (name, n, values.size))
+
+    return values
+
+
+def buildParameters(config):
+    '''Builds the parameters list [masses, lengths, initial conditions, time constraints] from the configuration.
+    Angles are given in deg and angular velocities in deg/s, as in the inputParameters.py module'''
+
+    n = int(config['system'])
+    if n not in EQUATIONS:
+        raise ValueError('System %d not supported, choose 1, 2 or 3' % n)
+
+    masses = perSegment(config['masses'], n, 'masses')
+    lengths = perSegment(config['lengths'], n, 'lengths')
+
+    # Fill the initial conditions array with angles and angular velocities
+    q0 = np.zeros(2*n)
+    q0[::2] = np.radians(perSegment(config['theta'], n, 'theta'))
+    q0[1::2] = np.radians(perSegment(config['omega'], n, 'omega'))
+
+    return n, [*masses, *lengths, q0, int(config['t0']), int(config['tf']), int(config['nstep'])]
+
+
+def parseArguments(argv=None):
+    '''Command line arguments, any of them overrides the corresponding value of the config file'''
+
+    parser = argparse.ArgumentParser(description='Headless simple, double and triple pendulum simulation')
+    parser.add_argument('config', nargs='?', help='config file (.toml or .json)')
+    parser.add_argument('-n', '--system', type=int, choices=sorted(EQUATIONS), help='number of segments: 1 simple, 2 double, 3 triple pendulum')
+    parser.add_argument('-m', '--masses', type=float, nargs='+', help='masses of the points (kg)')
+    parser.add_argument('-l', '--lengths', type=float, nargs='+', help='lengths of the ropes (m)')
+    parser.add_argument('--theta', type=float, nargs='+', help='initial angles (deg)')
+    parser.add_argument('--omega', type=float, nargs='+', help='initial angular velocities (deg/s)')
+    parser.add_argument('--t0', type=int, help='starting time (s)')
+    parser.add_argument('--tf', type=int, help='ending time (s)')
+    parser.add_argument('--nstep', type=int, help='number of iterations')
+    parser.add_argument('-s', '--solver', choices=list(SOLVERS), help='integration method')
+    parser.add_argument('--npz', help='save t, q, x, y and the energies to this .npz file')
+    parser.add_argument('--store', help='save the run to this directory with the trajectoryStore.py module')
+    parser.add_argument('--plot', help='save the static figure to this picture')
+    parser.add_argument('--profile', help='record the stages of the run and save the report to this JSON file')
+    parser.add_argument('--trace', help='record the stages of the run and save them to this Chrome trace file')
+    parser.add_argument('--profile-memory', action='store_true', help='record the memory allocated by each stage too (much slower)')
+
+    return parser.parse_args(argv)
+
+
+def loadConfiguration(args):
+    '''Merges defaults, config file and command line arguments, in increasing order of priority'''
+
+    config = dict(DEFAULTS)
+    config['output'] = {}
+    if args.config:
+        fileConfig = readConfig(args.config)
+        unknown = set(fileConfig) - set(DEFAULTS)
+        if unknown:
+            raise ValueError('Unknown config keys: %s' % ', '.join(sorted(unknown)))
+        config.update(fileConfig)
+
+    # Command line arguments
+    for key in ('system', 'masses', 'lengths', 'theta', 'omega', 't0', 'tf', 'nstep', 'solver'):
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value[0] if isinstance(value, list) and len(value) == 1 else value
+
+    # Command line outputs
+    if not isinstance(config['output'], dict):
+        raise ValueError('"output" must be a table of outputs: %s' % ', '.join(OUTPUTS))
+    config['output'] = dict(config['output'])
+    unknown = set(config['output']) - set(OUTPUTS)
+    if unknown:
+        raise ValueError('Unknown outputs: %s' % ', '.join(sorted(unknown)))
+    for key in OUTPUTS:
+        value = getattr(args, key)
+        if value is not None:
+            config['output'][key] = value
+
+    return config
+
+
+@profiling.profiled('batchRun.saveStaticPlot')
+def saveStaticPlot(n, q, t, x, y, par, fname):
+    '''Saves the static figure of the run, with the non interactive Agg backend'''
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from figureSetup import decimatedPlot, staticFigure, addLegend
+
+    # Create the figure and the axes using the staticFigure() function in the figureSetup.py module
+    fig, ax1, ax2, ax3 = staticFigure(n, q, par)
+
+    # Plot trajectories, theta and omega trends of each mass
+    for i in range(n):
+        decimatedPlot(ax1, x[:,i], y[:,i], '-', lw=2, color = COLORS[i], label = 'mass %d trajectory' % (i+1), parametric=True)
+        decimatedPlot(ax2, t, q[:,2*i], '-', lw=2, color = COLORS[i], label = 'mass %d θ(t)' % (i+1))
+        decimatedPlot(ax3, t, q[:,2*i+1], '-', lw=2, color = COLORS[i], label = 'mass %d ω(t)' % (i+1))
+
+    # Add a legend to the figures using the addLegend() function in the figureSetup.py module
+    addLegend(n, ax1, ax2, ax3)
+
+    fig.savefig(fname, dpi=300, facecolor='w')
+    plt.close(fig)
+
+
+def run(config):
+    '''Integrates the system described by the configuration and writes the requested outputs, returns q, t, h'''
+
+    n, par = buildParameters(config)
+    output = config['output']
+
+    # Integrate the equation of motion with the chosen solver
+    start = time.perf_counter()
+    q, t, h = solveMotion(EQUATIONS[n], n, par, config['solver'])
+    elapsed = time.perf_counter() - start
+
+    # Compute energies and cartesian coordinates
+    E, U, T = ENERGIES[n](q, par)
+    x, y = computeCoordinates(n, q, par)
+
+    print('%s pendulum, solver %s: %d steps in %.3f s, relative energy drift %.2e' % (
+        {1: 'Simple', 2: 'Double', 3: 'Triple'}[n], config['solver'], len(t) - 1, elapsed,
+        abs(T[-1] - T[0]) / max(abs(T[0]), 1e-12)))
+
+    # Write the requested outputs
+    if 'npz' in output:
+        np.savez_compressed(output['npz'], t=t, q=q, x=x, y=y, E=E, U=U, T=T)
+
+    if 'store' in output:
+        from trajectoryStore import TrajectoryWriter
+        with TrajectoryWriter(output['store'], n, par) as writer:
+            writer.write(t=t, q=q, x=x, y=y, E=E, U=U, T=T)
+
+    if 'plot' in output:
+        saveStaticPlot(n, q, t, x, y, par, output['plot'])
+
+    return q, t, h
+
+
+def main(argv=None):
+    '''Command line entry point'''
+
+    args = parseArguments(argv)
+
+    # Opt-in instrumentation of the stages of the run
+    profile = args.profile or args.trace
+    if profile:
+        profiling.enable(allocations=args.profile_memory)
+
+    try:
+        config = loadConfiguration(args)
+        run(config)
+    except (OSError, ValueError, TypeError, KeyError) as error:
+        print('Error: %s' % error, file=sys.stderr)
+        return 1
+
+    if profile:
+        profiling.disable()
+        profiling.printReport()
+        if args.profile:
+            profiling.saveReport(args.profile)
+        if args.trace:
+            profiling.saveTrace(args.trace)
+
+    return 0
+
+
+# Call the main function when running the script
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    BENCHMARKS MODULE
+
+    The following code measures the throughput of integrators, equations of motion, energy, coordinates and rendering
+    on named scenarios, saves the results as JSON baselines and flags the regressions between runs
+"""
+
+# Python modules
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+
+
+# Directory of the Lagrange's equations code, for the integrate_pendulum() scenario
+LAGRANGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'LagrangesEquations')
+
+# Default initial conditions of the triple pendulum
+Q0 = np.radians([135, 0, 135, 0, 135, 0])
+
+
+def counted(f):
+    '''Wraps the equation of motion f, counting its calls in calls[0]'''
+
+    calls = [0]
+
+    def g(q, t, par, out=None):
+        calls[0] += 1
+        return f(q, t, par, out)
+
+    return g, calls
+
+
+# Each scenario takes the scale of the problem and returns the function running it once (returning the number of RHS evaluations, or None),
+# the amount of work done by each run and the unit of the work
+
+def tripleRk4(scale, steps=20000, tf=10):
+    '''Triple pendulum, Runge-Kutta 4, 20000 steps'''
+
+    from rungeKutta4 import RungeKutta4
+    from equationsMotion import triplePendulumEq
+
+    nstep = max(1, int(steps * scale))
+    f, calls = counted(triplePendulumEq)
+    par = [1, 1, 1, 1, 1, 1, Q0, 0, tf, nstep]
+
+    def run():
+        calls[0] = 0
+        RungeKutta4(f, par)
+        return calls[0]
+
+    return run, nstep, 'steps'
+
+
+def tripleRk41M(scale):
+    '''Triple pendulum, Runge-Kutta 4, 10^6 steps: the same time step of the compiled scenario, to compare the two.
+    The time span shrinks with the scale, so that the time step (and the trajectory) stays the same'''
+
+    return tripleRk4(scale, 1000000, max(1, int(1000 * scale)))
+
+
+def tripleRk4Compiled(scale):
+    '''Triple pendulum, Runge-Kutta 4 with the numba backend, 10^6 steps'''
+
+    from compiledBackend import RungeKutta4Compiled, HAS_NUMBA
+
+    if not HAS_NUMBA:
+        return None
+
+    nstep = max(1, int(1000000 * scale))
+    par = [1, 1, 1, 1, 1, 1, Q0, 0, 1000, nstep]
+
+    def run():
+        RungeKutta4Compiled(3, par, 'numba')
+        return 4 * nstep
+
+    return run, nstep, 'steps'
+
+
+def ensemble10k(scale, precision='double'):
+    '''Ensemble of 10^4 triple pendulums, Runge-Kutta 4, 200 steps'''
+
+    from rungeKutta4 import RungeKutta4Ensemble
+    from equationsMotion import triplePendulumEq
+
+    members = max(1, int(10000 * scale))
+    nstep = 200
+    q0 = np.zeros((members, 6))
+    q0[:, ::2] = np.random.default_rng(0).uniform(-np.pi, np.pi, (members, 3))
+    f, calls = counted(triplePendulumEq)
+    par = [1, 1, 1, 1, 1, 1, q0, 0, 10, nstep]
+
+    def run():
+        calls[0] = 0
+        RungeKutta4Ensemble(f, par, precision)
+        return calls[0] * members
+
+    return run, members * nstep, 'member steps'
+
+
+def ensemble10kSingle(scale):
+    '''Ensemble of 10^4 triple pendulums, Runge-Kutta 4 in float32, 200 steps'''
+
+    return ensemble10k(scale, 'single')
+
+
+def tripleDp45(scale):
+    '''Triple pendulum, Dormand-Prince 5(4) with rtol 1e-8, 10 s'''
+
+    from dormandPrince import DormandPrince45
+    from equationsMotion import triplePendulumEq
+
+    nstep = max(1, int(1000 * scale))
+    par = [1, 1, 1, 1, 1, 1, Q0, 0, 10, nstep]
+
+    def run():
+        q, t, h, stats = DormandPrince45(triplePendulumEq, par, rtol=1e-8, atol=1e-10, info=True)
+        run.steps = stats['naccept']
+        return stats['nfev']
+
+    # The work is the number of accepted steps, known after the first run
+    run()
+    return run, run.steps, 'steps'
+
+
+def chain20(scale):
+    '''Chain of 20 segments through integrate_pendulum(), 1000 output samples over 2 s'''
+
+    if LAGRANGE_DIR not in sys.path:
+        sys.path.append(LAGRANGE_DIR)
+    import TriplePendulum_Code as tp
+
+    samples = max(2, int(1000 * scale))
+    times = np.linspace(0, 2, samples)
+
+    def run():
+
+        # Count the RHS evaluations by wrapping the rope tensions solver called by the gradient
+        calls = [0]
+        accelerations = tp.chain_accelerations
+
+        def countedAccelerations(*args):
+            calls[0] += 1
+            return accelerations(*args)
+
+        tp.chain_accelerations = countedAccelerations
+        try:
+            tp.integrate_pendulum(20, times)
+        finally:
+            tp.chain_accelerations = accelerations
+        return calls[0]
+
+    return run, samples, 'samples'
+
+
+def energy1M(scale):
+    '''Energies of a triple pendulum trajectory of 10^6 samples'''
+
+    from computeEnergy import triplePendulumEnergy
+
+    samples = max(1, int(1000000 * scale))
+    q = np.random.default_rng(0).uniform(-np.pi, np.pi, (samples, 6))
+    par = [1, 1, 1, 1, 1, 1, Q0, 0, 10, samples]
+
+    def run():
+        triplePendulumEnergy(q, par)
+
+    return run, samples, 'samples'
+
+
+def coordinates1M(scale):
+    '''Cartesian coordinates of a triple pendulum trajectory of 10^6 samples'''
+
+    from computeCoordinates import computeCoordinates
+
+    samples = max(1, int(1000000 * scale))
+    q = np.random.default_rng(0).uniform(-np.pi, np.pi, (samples, 6))
+    par = [1, 1, 1, 1, 1, 1, Q0, 0, 10, samples]
+
+    def run():
+        computeCoordinates(3, q, par)
+
+    return run, samples, 'samples'
+
+
+def renderFrames(scale):
+    '''Animated triple pendulum figure, 200 frames fully drawn with the Agg backend'''
+
+    import matplotlib
+    matplotlib.use('Agg')
+    from rungeKutta4 import RungeKutta4
+    from equationsMotion import triplePendulumEq
+    from computeEnergy import triplePendulumEnergy
+    from computeCoordinates import computeCoordinates
+    from figureSetup import animatedFigure
+    from animationModule import PendulumAnimator, triplePendulumAnimation, triplePendulumTrend, kineticEnergyAnimation, potentialEnergyAnimation, energyBar, energyScale
+
+    # The time span shrinks with the scale, keeping the time step of 0.05 s (a larger one makes the triple pendulum diverge)
+    tf = max(1, int(10 * scale))
+    frames = 20 * tf
+    par = [1, 1, 1, 1, 1, 1, Q0, 0, tf, frames]
+    q, t, h = RungeKutta4(triplePendulumEq, par)
+    E, U, T = triplePendulumEnergy(q, par)
+    x, y = computeCoordinates(3, q, par)
+
+    # Same artists of the animated triple pendulum figure
+    fig, ax1, ax2, ax3, ax4, ax5 = animatedFigure(3, q, par)
+    masses = [ax1.plot([], [], 'o', color = '#000000', markersize = 5+k)[0] for k in range(4)]
+    segments, = ax1.plot([], [], '-', lw=2, color = '#000000')
+    traces = [ax1.plot([], [], '-', lw=2)[0] for k in range(3)]
+    thetaTraces = [ax2.plot([], [], '-', lw=2)[0] for k in range(3)]
+    omegaTraces = [ax3.plot([], [], '-', lw=2)[0] for k in range(3)]
+    texts = ['time = %.1fs', ax1.text(0.05, 0.95, '', transform=ax1.transAxes), 'total energy = %.2f J', ax1.text(0.05, 0.87, '', transform=ax1.transAxes)]
+    norm = energyScale(E, U)
+
+    animator = PendulumAnimator(fig, len(t), h)
+    animator.add(triplePendulumAnimation, x, y, traces, masses, segments, texts, T, h)
+    animator.add(kineticEnergyAnimation, energyBar(ax4, 'red'), E, norm)
+    animator.add(potentialEnergyAnimation, energyBar(ax5, 'blue'), U, norm)
+    animator.add(triplePendulumTrend, 'theta', t, q, thetaTraces)
+    animator.add(triplePendulumTrend, 'omega', t, q, omegaTraces)
+
+    def run():
+        for i in range(frames):
+            animator.update(i)
+            fig.canvas.draw()
+
+    return run, frames, 'frames'
+
+
+# Named scenarios
+SCENARIOS = {
+    'triple-rk4': tripleRk4,
+    'triple-rk4-1M': tripleRk41M,
+    'triple-rk4c-1M': tripleRk4Compiled,
+    'ensemble-10k': ensemble10k,
+    'ensemble-10k-f32': ensemble10kSingle,
+    'triple-dp45': tripleDp45,
+    'chain-20': chain20,
+    'energy-1M': energy1M,
+    'coordinates-1M': coordinates1M,
+    'render-200': renderFrames,
+    }
+
+
+def runScenario(name, scale=1, repeat=3, memory=True):
+    '''Runs a scenario repeat times, returns its best time, throughput, RHS evaluations per second and peak traced memory (or None if it cannot run here)'''
+
+    scenario = SCENARIOS[name](scale)
+    if scenario is None:
+        return None
+    run, work, unit = scenario
+
+    # Best of the repeated runs (the first one also warms up caches and compiled code)
+    best = np.inf
+    for k in range(repeat):
+        start = time.perf_counter()
+        rhs = run()
+        best = min(best, time.perf_counter() - start)
+
+    # Peak memory allocated during one more run, traced separately so that tracing does not slow down the timed runs
+    peak = None
+    if memory:
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    return {
+        'scale': scale,
+        'seconds': best,
+        'work': work,
+        'unit': unit,
+        'rate': work / best,
+        'rhs_per_s': rhs / best if rhs else None,
+        'peak_mb': peak
+        }
+
+
+def compare(results, baseline, tolerance):
+    '''Lists the regressions of the results with respect to the baseline: throughput lower or peak memory higher by more than tolerance'''
+
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get('results', {}).get(name)
+        if old is None or result is None or 'error' in old or 'error' in result or old['scale'] != result['scale']:
+            continue
+        if result['rate'] < old['rate'] * (1 - tolerance):
+            regressions.append('%s: %.4g %s/s, baseline %.4g' % (name, result['rate'], result['unit'], old['rate']))
+        if result['peak_mb'] is not None and old['peak_mb'] is not None and result['peak_mb'] > old['peak_mb'] * (1 + tolerance) + 1:
+            regressions.append('%s: peak memory %.1f MB, baseline %.1f MB' % (name, result['peak_mb'], old['peak_mb']))
+
+    return regressions
+
+
+def main(argv=None):
+    '''Runs the scenarios, prints the results, saves and compares the baselines; returns 1 if a scenario fails or a regression is found'''
+
+    parser = argparse.ArgumentParser(description='Benchmark suite of the pendulum simulations')
+    parser.add_argument('scenarios', nargs='*', default=list(SCENARIOS), help='scenarios to run (all by default): %s' % ', '.join(SCENARIOS))
+    parser.add_argument('--scale', type=float, default=1, help='scale of the problem sizes, e.g. 0.1 for a quick run')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs of each scenario, the best one is kept')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory measurement')
+    parser.add_argument('--save', help='save the results to this JSON baseline')
+    parser.add_argument('--compare', help='compare the results with this JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative slowdown (or memory growth) flagged as a regression')
+    args = parser.parse_args(argv)
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error('Unknown scenario "%s", choose among: %s' % (name, ', '.join(SCENARIOS)))
+
+    results = {}
+    failed = False
+    print('%-16s %10s %16s %14s %10s' % ('scenario', 'time (s)', 'throughput (/s)', 'RHS evals/s', 'peak MB'))
+    for name in args.scenarios:
+
+        # A failing scenario is recorded and the suite carries on with the others
+        try:
+            result = runScenario(name, args.scale, args.repeat, not args.no_memory)
+        except Exception as error:
+            results[name] = {'scale': args.scale, 'error': '%s: %s' % (type(error).__name__, error)}
+            failed = True
+            print('%-16s %s' % (name, 'FAILED %s' % results[name]['error']))
+            continue
+
+        results[name] = result
+        if result is None:
+            print('%-16s %s' % (name, 'skipped (not available here)'))
+            continue
+        print('%-16s %10.4f %16s %14s %10s  %s' % (
+            name, result['seconds'], '%.4g' % result['rate'],
+            '%.4g' % result['rhs_per_s'] if result['rhs_per_s'] else '-',
+            '%.1f' % result['peak_mb'] if result['peak_mb'] is not None else '-', result['unit']))
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'results': results
+        }
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(report, file, indent=1)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION %s' % regression)
+        if regressions:
+            return 1
+
+    return 1 if failed else 0
+
+
+# Call the main function when running the script
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    COMPILED BACKEND MODULE
+
+    The following code implements the equations of motion and the Runge-Kutta 4 loop as compiled kernels,
+    using Numba when it is installed and falling back to plain Python/NumPy otherwise
+"""
+
+# Python modules
+import math
+import importlib.util
+import numpy as np
+
+# Custom made module
+from pendulumSystem import PendulumSystem
+
+# Numba is optional: without it the kernels run as plain Python functions.
+# It is only looked up here and imported the first time a kernel is compiled, since importing it is slow
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+
+
+# The kernels take the state q, the time t, the array p = [masses, lengths, g] and write the derivative into the preallocated array out.
+# They are the same equations of the equationsMotion.py module, written with scalar operations so that they can be compiled.
+
+def simplePendulumKernel(q, t, p, out):
+    '''Simple Pendulum equation of motion kernel'''
+
+    # Define relevant parameters
+    m1 = p[0]
+    l1 = p[1]
+    g = p[2]
+
+    # ThetaDot and OmegaDot equations
+    out[0] = q[1]
+    out[1] = -m1*(g/l1)*math.sin(q[0])
+
+
+def doublePendulumKernel(q, t, p, out):
+    '''Double Pendulum equation of motion kernel'''
+
+    # Define relevant parameters
+    m1 = p[0]
+    m2 = p[1]
+    l1 = p[2]
+    l2 = p[3]
+    g = p[4]
+
+    # Define useful sines and cosines
+    s01 = math.sin(q[0]-q[2])
+    c01 = math.cos(q[0]-q[2])
+    den = 2*m1 + m2 - m2*math.cos(2*q[0]-2*q[2])
+
+    # ThetaDot equations
+    out[0] = q[1]
+    out[2] = q[3]
+
+    # OmegaDot equations
+    out[1] = (-g * (2*m1 + m2) * math.sin(q[0]) - m2 * g * math.sin(q[0]-2*q[2]) - 2 * s01 * m2 * (l2 * q[3]**2 + l1 * q[1]**2 * c01)) / (l1 * den)
+    out[3] = (2 * s01 * (l1 * q[1]**2 * (m1+m2) + g * (m1+m2) * math.cos(q[0]) + m2 * l2 * q[3]**2 * c01)) / (l2 * den)
+
+
+def triplePendulumKernel(q, t, p, out):
+    '''Triple Pendulum equation of motion kernel'''
+
+    # Define relevant parameters
+    m1 = p[0]
+    m2 = p[1]
+    m3 = p[2]
+    l1 = p[3]
+    l2 = p[4]
+    l3 = p[5]
+    g = p[6]
+
+    # Define useful mass combinations
+    m12 = m2 + m3
+    m012 = m1 + m2 + m3
+    mf = m012/4
+
+    # Define useful sines
+    sin0 = math.sin(q[0])
+    sin1 = math.sin(q[2])
+    sin2 = math.sin(q[4])
+
+    # Define useful sine and cosine of differences
+    cos01 = math.cos(q[0]-q[2])
+    cos02 = math.cos(q[0]-q[4])
+    cos12 = math.cos(q[2]-q[4])
+    sin01 = math.sin(q[0]-q[2])
+    sin02 = math.sin(q[0]-q[4])
+    sin12 = math.sin(q[2]-q[4])
+
+    # Define useful squared velocities
+    w0 = q[1]**2
+    w1 = q[3]**2
+    w2 = q[5]**2
+
+    # Define useful recurrent patterns
+    r1 = m12*cos01*cos02 - m012*cos12
+    r2 = m012 - m12*cos01**2
+    r3 = -m012 + m3*cos02**2
+    r4 = m3*r1**2 + m12*r3*r2
+
+    # Define the generalized forces shared by the three equations
+    f0 = g*m012*sin0 + l2*m12*sin01*w1 + l3*m3*sin02*w2
+    f1 = -g*m12*sin1 + l1*m12*sin01*w0 - l3*m3*sin12*w2
+    f2 = -g*sin2 + l1*sin02*w0 + l2*sin12*w1
+
+    # Define parts of the first equation
+    od1_2 = r1*cos01 + r2*cos02
+    od1_5 = -m3*m12*(-cos02 + math.cos(q[0]-2*q[2]+q[4]))**2 * m012
+
+    # ThetaDot equations
+    out[0] = q[1]
+    out[2] = q[3]
+    out[4] = q[5]
+
+    # OmegaDot equations
+    out[1] = mf * (4*m3*m12 * od1_2 * f2 * r2 - 4 * (-m3 * od1_2 * r1 + r4 * cos01) * f1 - (od1_5 + 4*r4) * f0) / (l1 * r4 * m012 * r2)
+    out[3] = (-m3 * r1 * m012 * f2 * r2 - (m3 * od1_2 * r1 - r4 * cos01) * f0 + m012 * r3 * r2 * f1) / (l2 * r4 * r2)
+    out[5] = -(m12 * od1_2 * f0 + m12 * m012 * f2 * r2 + r1 * m012 * f1) / (l3 * r4)
+
+
+def rk4LoopNumpy(kernel, q, t, p, h):
+    '''Runge-Kutta 4 loop with in-place NumPy operations on preallocated stage buffers'''
+
+    # Preallocate the stages and the intermediate state
+    k1 = np.empty(q.shape[1])
+    k2 = np.empty(q.shape[1])
+    k3 = np.empty(q.shape[1])
+    k4 = np.empty(q.shape[1])
+    tmp = np.empty(q.shape[1])
+
+    for i in range(len(t)-1):
+        kernel(q[i], t[i], p, k1)
+        np.multiply(k1, 0.5*h, out=tmp)
+        tmp += q[i]
+        kernel(tmp, t[i] + 0.5*h, p, k2)
+        np.multiply(k2, 0.5*h, out=tmp)
+        tmp += q[i]
+        kernel(tmp, t[i] + 0.5*h, p, k3)
+        np.multiply(k3, h, out=tmp)
+        tmp += q[i]
+        kernel(tmp, t[i] + h, p, k4)
+
+        # Combine the stages into the new state
+        k2 += k3
+        k2 *= 2
+        k2 += k1
+        k2 += k4
+        k2 *= h/6
+        np.add(q[i], k2, out=q[i+1])
+
+
+def makeRk4LoopNumba(kernel):
+    '''Compiles a Runge-Kutta 4 loop specialised for the compiled kernel, with element-wise operations on preallocated stage buffers'''
+
+    import numba
+
+    @numba.njit(cache=True)
+    def rk4Loop(q, t, p, h):
+        d = q.shape[1]
+        k1 = np.empty(d)
+        k2 = np.empty(d)
+        k3 = np.empty(d)
+        k4 = np.empty(d)
+        tmp = np.empty(d)
+
+        for i in range(len(t)-1):
+            kernel(q[i], t[i], p, k1)
+            for j in range(d):
+                tmp[j] = q[i, j] + 0.5*h*k1[j]
+            kernel(tmp, t[i] + 0.5*h, p, k2)
+            for j in range(d):
+                tmp[j] = q[i, j] + 0.5*h*k2[j]
+            kernel(tmp, t[i] + 0.5*h, p, k3)
+            for j in range(d):
+                tmp[j] = q[i, j] + h*k3[j]
+            kernel(tmp, t[i] + h, p, k4)
+            for j in range(d):
+                q[i+1, j] = q[i, j] + h*(k1[j] + 2*(k2[j] + k3[j]) + k4[j])/6
+
+    return rk4Loop
+
+
+# Python kernels for each type of system
+KERNELS = {1: simplePendulumKernel, 2: doublePendulumKernel, 3: triplePendulumKernel}
+
+# Compiled kernels and loops, built lazily the first time they are needed
+compiledKernels = {}
+compiledLoops = {}
+
+# Backend used when no backend is explicitly requested
+defaultBackend = 'numba' if HAS_NUMBA else 'numpy'
+
+
+def setBackend(backend):
+    '''Selects the default backend at runtime: "numba" or "numpy"'''
+
+    global defaultBackend
+
+    if backend == 'numba' and not HAS_NUMBA:
+        raise ImportError('The numba backend requires the numba package')
+    elif backend not in ('numba', 'numpy'):
+        raise ValueError('Backend "%s" not supported, choose "numba" or "numpy"' % backend)
+
+    defaultBackend = backend
+
+
+def getKernel(n, backend=None):
+    '''Returns the equation of motion kernel kernel(q, t, p, out) of the system made of n segments for the chosen backend'''
+
+    backend = backend or defaultBackend
+
+    # Plain Python kernel
+    if backend == 'numpy':
+        return KERNELS[n]
+
+    # Compile the kernel the first time it is needed
+    if n not in compiledKernels:
+        import numba
+        compiledKernels[n] = numba.njit(cache=True)(KERNELS[n])
+
+    return compiledKernels[n]
+
+
+def kernelParameters(n, par):
+    '''Packs the masses and lengths of the parameters list, and the gravity of a PendulumSystem (9.81 for a list), into the array used by the kernels'''
+
+    g = par.g if isinstance(par, PendulumSystem) else 9.81
+    return np.array([*par[:2*n], g], dtype=float)
+
+
+def RungeKutta4Compiled(n, par, backend=None):
+    '''Runge-Kutta 4 with the compiled backend: same parameters list and same returned q, t and h of RungeKutta4, for the system made of n segments'''
+
+    backend = backend or defaultBackend
+
+    # Unpack initial conditions
+    q0 = par[-4]
+
+    # Unpack time conditions and number of iterations
+    t0 = par[-3]
+    tf = par[-2]
+    nstep = par[-1]
+
+    # Make the time grid
+    t = np.linspace(int(t0), int(tf), int(nstep)+1)
+    h = t[1]-t[0]
+
+    # Initialize the solution array
+    q = np.empty((int(nstep)+1, 2*n))
+    q[0] = q0
+
+    # Pack masses, lengths and gravity
+    p = kernelParameters(n, par)
+
+    # Fill the solution array with the loop of the chosen backend
+    if backend == 'numpy':
+        rk4LoopNumpy(KERNELS[n], q, t, p, h)
+    else:
+        if n not in compiledLoops:
+            compiledLoops[n] = makeRk4LoopNumba(getKernel(n, 'numba'))
+        compiledLoops[n](q, t, p, h)
+
+    return q, t, h
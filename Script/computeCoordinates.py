@@ -14,35 +14,49 @@
 # Python module
 import numpy as np 
 
+# Custom made modules
+from profiling import profiled
+from pendulumSystem import PendulumSystem
 
-def computeCoordinates(n, q, par):
-    '''Computes cartesian coordinates from generalized coordinates'''
 
-    # Initialize (x, y) arrays to be multi dimensional arrays depending on the type of pendulum
-    x = np.zeros((n, len(q[:,0])))
-    y = np.zeros((n, len(q[:,0])))
-
-    # If the system is the simple pendulum
-    if n == 1:
-
-        x[0] = +par[n] * np.sin(q[:,0])
-        y[0] = -par[n] * np.cos(q[:,0])
-
-    # If the system is the double pendulum
-    elif n == 2:
-        x[0] = +par[n] * np.sin(q[:,0])
-        y[0] = -par[n] * np.cos(q[:,0])
-        x[1] = +par[n+1] * np.sin(q[:,2]) + x[0]
-        y[1] = -par[n+1] * np.cos(q[:,2]) + y[0]
-    
-    # If the system is the triple pendulum
-    elif n == 3:
-        x[0] = +par[n] * np.sin(q[:,0])
-        y[0] = -par[n] * np.cos(q[:,0])
-        x[1] = +par[n+1] * np.sin(q[:,2]) + x[0]
-        y[1] = -par[n+1] * np.cos(q[:,2]) + y[0]
-        x[2] = +par[n+2] * np.sin(q[:,4]) + x[1]
-        y[2] = -par[n+2] * np.cos(q[:,4]) + y[1]
-
-    return x.T, y.T
+@profiled('computeCoordinates.chainCoordinates')
+def chainCoordinates(q, lengths, chunk=None, out=None):
+    '''Computes the cartesian coordinates of the masses of a pendulum made of any number of segments, returns the (len(q), n) arrays x and y.
+    The coordinates are computed on chunk samples at a time (all of them if chunk is None), and written into out if given, an array of shape (2, len(q), n)'''
+
+    l = np.asarray(lengths, dtype=float)
+    n = len(l)
+
+    # Initialize (or reuse) the arrays for the coordinates
+    if out is None:
+        out = np.empty((2, len(q), n))
+    x, y = out
+
+    # Process the trajectory one chunk at a time, working in place so that no temporary exceeds the chunk size
+    chunk = chunk or max(len(q), 1)
+    for start in range(0, len(q), chunk):
+        stop = min(start + chunk, len(q))
+        th = q[start:stop, ::2]
+        xc = x[start:stop]
+        yc = y[start:stop]
+
+        # Position of each mass relative to the previous one
+        np.sin(th, out=xc)
+        np.cos(th, out=yc)
+        xc *= l
+        yc *= -l
+
+        # Position of each mass: cumulative sum along the chain
+        for k in range(1, n):
+            xc[:, k] += xc[:, k-1]
+            yc[:, k] += yc[:, k-1]
+
+    return x, y
+
+
+def computeCoordinates(n, q, par, chunk=None, out=None):
+    '''Computes cartesian coordinates from generalized coordinates'''
 
+    # Unpack the relevant parameters: lengths (already an array in a PendulumSystem)
+    lengths = par.lengths if isinstance(par, PendulumSystem) else par[n:2*n]
+    return chainCoordinates(q, lengths, chunk, out)
@@ -2,7 +2,7 @@
     TRIPLE PENDULUM SCRIPT
 
     Author: Nicolò Lai
-    Project: Triple Pendulum 
+    Project: Triple Pendulum
     Goal: Solving the equation of motions of a triple pendulum
     Means: Runge-Kutta 4 iterative method
 
@@ -14,80 +14,97 @@
 # Python module
 import numpy as np
 
+# Custom made modules
+from profiling import profiled
+from pendulumSystem import PendulumSystem, chainMasses
 
-def simplePendulumEnergy(q, par):
-    '''Computes and returns total energy of the simple pendulum system'''
 
-    # Unpack the relevant parameters
-    m1 = par[0]
-    l1 = par[1]
+def chainEnergy(q, masses, lengths, chunk=None, out=None, g=9.81):
+    '''Computes and returns kinetic, potential and total energy of a pendulum made of any number of segments, with gravity g.
+    The energies are computed on chunk samples at a time (all of them if chunk is None), and written into out if given, an array of shape (3, len(q))'''
 
-    # Unpack theta and omega from the generalized coordinates array q
-    t1, o1 = q.T
+    # Define relevant parameters
+    l = np.asarray(lengths, dtype=float)
+    mu = chainMasses(masses)
 
-    # Initialize arrays for the three energies
-    E = np.zeros(len(t1))
-    U = np.zeros(len(t1))
-    T = np.zeros(len(t1))
+    # Potential energy weights: mass hanging below each rope times its length
+    w = np.diag(mu) * l
 
-    # Fill the energy arrays 
-    for i in range(len(t1)):
-        E[i] = 0.5 * m1 * l1**2 * o1[i]**2
-        U[i] = - m1 * 9.81 * l1*np.cos(t1[i])
-        T[i] = E[i] + U[i]
+    return energyKernel(q, l, mu, w, g, chunk, out)
 
-    return E, U, T
 
+def systemEnergy(q, system, chunk=None, out=None):
+    '''Computes and returns kinetic, potential and total energy of the trajectory q of a PendulumSystem, with its precomputed weights and gravity'''
+
+    if system.mu is None:
+        raise ValueError('The energies can only be computed for a single system, not for a batch')
+
+    return energyKernel(q, system.lengths, system.mu, system.w, system.g, chunk, out)
 
-def doublePendulumEnergy(q, par):
-    '''Computes and returns total energy of the double pendulum system'''
 
-    # Unpack the relevant parameters
-    m1 = par[0]
-    m2 = par[1]
-    l1 = par[2]
-    l2 = par[3]
+@profiled('computeEnergy.energyKernel')
+def energyKernel(q, l, mu, w, g, chunk, out):
+    '''Energies of the trajectory q of a chain with lengths l, mass matrix weights mu and potential energy weights w'''
 
-    # Unpack theta and omega from the generalized coordinates array q
-    t1, o1, t2, o2 = q.T
+    # Initialize (or reuse) the arrays for the three energies
+    if out is None:
+        out = np.empty((3, len(q)))
+    E, U, T = out
 
-    # Initialize arrays for the three energies
-    E = np.zeros(len(t1))
-    U = np.zeros(len(t1))
-    T = np.zeros(len(t1))
+    # Process the trajectory one chunk at a time, so that the temporaries never exceed the chunk size (an empty trajectory has no chunk)
+    chunk = chunk or max(len(q), 1)
+    for start in range(0, len(q), chunk):
+        stop = min(start + chunk, len(q))
 
-    # Fill the energy arrays
-    for i in range(len(t1)):
-        E[i] = 0.5 * (m1+m2) * l1**2 * o1[i]**2 + 0.5 * m2 * l2**2 * o2[i]**2 + m2 * l1 * l2 * o1[i]*o2[i]*np.cos(t1[i]-t2[i])
-        U[i] = - m1 * 9.81 * l1*np.cos(t1[i]) - m2 * 9.81 * (l1*np.cos(t1[i]) + l2*np.cos(t2[i]))
-        T[i] = E[i] + U[i]
+        # Unpack thetas and omegas of the chunk from the generalized coordinates array q
+        th = q[start:stop, ::2]
+        lo = q[start:stop, 1::2] * l
+
+        # Kinetic energy 1/2 * sum_ij mu_ij l_i l_j omega_i omega_j cos(theta_i - theta_j),
+        # splitting cos(theta_i - theta_j) = cos(theta_i)cos(theta_j) + sin(theta_i)sin(theta_j)
+        c = np.cos(th)
+        s = np.sin(th)
+        a = lo * c
+        b = lo * s
+        E[start:stop] = 0.5 * (np.einsum('ki,ij,kj->k', a, mu, a) + np.einsum('ki,ij,kj->k', b, mu, b))
+
+        # Potential energy
+        np.dot(c, -g * w, out=U[start:stop])
+
+    # Total energy
+    np.add(E, U, out=T)
 
     return E, U, T
 
 
-def triplePendulumEnergy(q, par):
+def simplePendulumEnergy(q, par, chunk=None, out=None):
+    '''Computes and returns total energy of the simple pendulum system'''
+
+    # A PendulumSystem carries its precomputed weights
+    if isinstance(par, PendulumSystem):
+        return systemEnergy(q, par, chunk, out)
+
+    # Unpack the relevant parameters: masses and lengths
+    return chainEnergy(q, par[0:1], par[1:2], chunk, out)
+
+
+def doublePendulumEnergy(q, par, chunk=None, out=None):
+    '''Computes and returns total energy of the double pendulum system'''
+
+    # A PendulumSystem carries its precomputed weights
+    if isinstance(par, PendulumSystem):
+        return systemEnergy(q, par, chunk, out)
+
+    # Unpack the relevant parameters: masses and lengths
+    return chainEnergy(q, par[0:2], par[2:4], chunk, out)
+
+
+def triplePendulumEnergy(q, par, chunk=None, out=None):
     '''Computes and returns total energy of the triple pendulum system'''
 
-    # Unpack the relevant parameters
-    m1 = par[0]
-    m2 = par[1]
-    m3 = par[2]
-    l1 = par[3]
-    l2 = par[4]
-    l3 = par[5]
-
-    # Unpack theta and omega from the generalized coordinates array q
-    t1, o1, t2, o2, t3, o3 = q.T
-
-    # Initialize arrays for the three energies
-    E = np.zeros(len(t1))
-    U = np.zeros(len(t1))
-    T  = np.zeros(len(t1))
-
-    # Fill the energy arrays
-    for i in range(len(t1)):
-        E[i] = 0.5 * (m1+m2+m3) * l1**2 * o1[i]**2 + 0.5 * (m2+m3) * l2**2 * o2[i]**2 + 0.5 * m3 * l3**2 * o3[i]**2 + (m2+m3)*l1*l2*o1[i]*o2[i]*np.cos(t1[i]-t2[i]) +  m3*l1*l3*o1[i]*o3[i]*np.cos(t1[i]-t3[i]) + m3*l2*l3*o2[i]*o3[i]*np.cos(t2[i]-t3[i])
-        U[i] = - 9.81 * ( l1*(m1+m2+m3)*np.cos(t1[i]) + l2*(m2+m3)*np.cos(t2[i]) +  l3*m3*np.cos(t3[i]) )
-        T[i] = E[i] + U[i]
-
-    return E, U, T
\ No newline at end of file
+    # A PendulumSystem carries its precomputed weights
+    if isinstance(par, PendulumSystem):
+        return systemEnergy(q, par, chunk, out)
+
+    # Unpack the relevant parameters: masses and lengths
+    return chainEnergy(q, par[0:3], par[3:6], chunk, out)
@@ -0,0 +1,164 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    DORMAND-PRINCE MODULE
+
+    The following code is an adaptive step implementation of the embedded Dormand-Prince 5(4) method
+"""
+
+# Python module
+import numpy as np
+
+
+# Dormand-Prince 5(4) Butcher tableau
+C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+A = [
+    np.array([]),
+    np.array([1/5]),
+    np.array([3/40, 9/40]),
+    np.array([44/45, -56/15, 32/9]),
+    np.array([19372/6561, -25360/2187, 64448/6561, -212/729]),
+    np.array([9017/3168, -355/33, 46732/5247, 49/176, -5103/18656])
+    ]
+
+# 5th order weights (the last stage is evaluated at the new point and reused as first stage of the next step)
+B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0])
+
+# Difference between the 5th and the embedded 4th order weights, used to estimate the local error
+Err = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+
+# Coefficients of the 4th order continuous extension (dense output) of the method
+P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]
+    ])
+
+# Step size controller: safety factor and bounds on the step change
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10
+
+
+def initialStep(f, q0, f0, t0, par, rtol, atol):
+    '''Guess the first step size from the scale of the solution and of its derivatives'''
+
+    # Scale of the solution and of its derivative
+    scale = atol + np.abs(q0) * rtol
+    d0 = np.sqrt(np.mean((q0 / scale)**2))
+    d1 = np.sqrt(np.mean((f0 / scale)**2))
+
+    # First guess
+    h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+
+    # Estimate the second derivative with an explicit Euler step
+    f1 = f(q0 + h0 * f0, t0 + h0, par)
+    d2 = np.sqrt(np.mean(((f1 - f0) / scale)**2)) / h0
+
+    # Second guess, matching a 5th order local error to the tolerance
+    if d1 <= 1e-15 and d2 <= 1e-15:
+        h1 = max(1e-6, h0 * 1e-3)
+    else:
+        h1 = (0.01 / max(d1, d2))**(1/5)
+
+    return min(100 * h0, h1)
+
+
+def DormandPrince45(f, par, rtol=1e-6, atol=1e-9, info=False):
+    '''Dormand-Prince 5(4): adaptive step version of RungeKutta4, it asks for the same callable equation of motion function f and list of parameters,
+    controls the step size with the tolerances rtol and atol and resamples the solution onto the same time grid of RungeKutta4'''
+
+    # Unpack initial conditions
+    q0 = np.asarray(par[-4], dtype=float)
+
+    # Unpack time conditions and number of output points
+    t0 = par[-3]
+    tf = par[-2]
+    n  = par[-1]
+
+    # Make the output time grid, the same one of RungeKutta4
+    t = np.linspace(int(t0), int(tf), int(n)+1)
+    h = t[1]-t[0]
+
+    # Initialize the solution array
+    q = np.empty((int(n)+1, len(q0)))
+    q[0] = q0
+
+    # Empty time interval: the system stays in its initial state, as with RungeKutta4 (there is no step to take)
+    if t[-1] == t[0]:
+        q[1:] = q0
+        if info:
+            return q, t, h, {'nfev': 0, 'naccept': 0, 'nreject': 0}
+        return q, t, h
+
+    # Stages of the method, the last row is the derivative at the end of the step
+    K = np.empty((7, len(q0)))
+
+    # Initialize the integration
+    tc = t[0]
+    qc = q0.copy()
+    K[0] = f(qc, tc, par)
+    step = initialStep(f, qc, K[0], tc, par, rtol, atol)
+    nfev = 2
+    naccept = 0
+    nreject = 0
+
+    # Index of the next output time to fill
+    j = 1
+
+    # Step until the end of the time grid
+    while j < len(t):
+
+        # Do not step past the end of the time grid
+        step = min(step, t[-1] - tc)
+
+        # Compute the stages of the method
+        for s in range(1, 6):
+            K[s] = f(qc + step * (A[s] @ K[:s]), tc + C[s] * step, par)
+        qn = qc + step * (B[:6] @ K[:6])
+        K[6] = f(qn, tc + step, par)
+        nfev += 6
+
+        # Estimate the local error with the embedded 4th order solution
+        scale = atol + np.maximum(np.abs(qc), np.abs(qn)) * rtol
+        err = np.sqrt(np.mean((step * (Err @ K) / scale)**2))
+
+        # Reject the step and retry with a smaller one
+        if err > 1:
+            step *= max(MIN_FACTOR, SAFETY * err**(-1/5))
+            nreject += 1
+            continue
+
+        # Resample the accepted step onto the output times it covers, using the dense output
+        tn = tc + step
+        if j < len(t) and t[j] <= tn:
+            Q = K.T @ P
+            while j < len(t) and t[j] <= tn:
+                x = (t[j] - tc) / step
+                q[j] = qc + step * (Q @ np.cumprod(np.full(4, x)))
+                j += 1
+
+        # Choose the next step size
+        factor = MAX_FACTOR if err == 0 else min(MAX_FACTOR, SAFETY * err**(-1/5))
+        step *= factor
+        naccept += 1
+
+        # Advance to the new point (first same as last: the last stage is the next first stage)
+        tc = tn
+        qc = qn
+        K[0] = K[6]
+
+    # Return the integration statistics only if asked
+    if info:
+        return q, t, h, {'nfev': nfev, 'naccept': naccept, 'nreject': nreject}
+
+    return q, t, h
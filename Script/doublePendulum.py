@@ -13,21 +13,16 @@
 
 # Python modules
 import numpy as np 
-import matplotlib.pyplot as plt 
-from matplotlib import animation
 
 # Custom made modules
-from rungeKutta4 import RungeKutta4
+from solvers import solveMotion
 from equationsMotion import doublePendulumEq
 from inputParameters import inputParameters
 from computeEnergy import doublePendulumEnergy
-from figureSetup import staticFigure, animatedFigure, addLegend
 from computeCoordinates import computeCoordinates
-from animationModule import doublePendulumTrend, kineticEnergyAnimation, potentialEnergyAnimation, doublePendulumAnimation
-from saveFigure import saveStaticFig
 
 
-def doublePendulum(n):
+def doublePendulum(n, solver='rk4'):
     '''Double pendulum integration and animation'''
     print('\nYou chose the Double Pendulum\n')
 
@@ -67,11 +62,13 @@ def doublePendulum(n):
         par = inputParameters(n)
         m1, m2, l1, l2, q0, t0, tf, nstep = par
 
-    # Integrate the equation of motion using the RungeKutta4() function in rungeKutta4.py module
+    # Integrate the equation of motion using the solveMotion() function in solvers.py module
     # Arguments passed to the function are:
     # 1) the double pendulum equation of motion from the equationsMotion.py module
-    # 2) the parameters list
-    q, t, h = RungeKutta4(doublePendulumEq, par)
+    # 2) the type of system
+    # 3) the parameters list
+    # 4) the chosen solver (Runge-Kutta 4 by default)
+    q, t, h = solveMotion(doublePendulumEq, n, par, solver)
 
     # Compute the kinetic, potential and total energy through the doublePendulumEnergy() function in computeEnergy.py module
     E, U, T = doublePendulumEnergy(q, par)
@@ -81,6 +78,12 @@ def doublePendulum(n):
     x, y = computeCoordinates(n, q, par)
 
 
+    # Plotting modules are imported only here, so that importing this module (e.g. from MAIN.py) does not load matplotlib
+    import matplotlib.pyplot as plt
+    from figureSetup import decimatedPlot, staticFigure, animatedFigure, addLegend
+    from animationModule import doublePendulumTrend, kineticEnergyAnimation, potentialEnergyAnimation, energyBar, energyScale, PendulumAnimator, doublePendulumAnimation
+    from saveFigure import saveStaticFig
+
     # Let the user decide whether to plot static figures or animated figures
     print('\nInsert 0 for static plots')
     print('Insert 1 to see animations\n')
@@ -93,16 +96,16 @@ def doublePendulum(n):
         fig, ax1, ax2, ax3 = staticFigure(n, q, par)
 
         # Plot the pendulum trajectory
-        ax1.plot(x[:,0], y[:,0], '-', lw=2, color = '#047FFF', label = '1st mass trajectory') 
-        ax1.plot(x[:,1], y[:,1], '-', lw=2, color = '#FF4B00', label = '2nd mass trajectory') 
+        decimatedPlot(ax1, x[:,0], y[:,0], '-', lw=2, color = '#047FFF', label = '1st mass trajectory', parametric=True)
+        decimatedPlot(ax1, x[:,1], y[:,1], '-', lw=2, color = '#FF4B00', label = '2nd mass trajectory', parametric=True)
 
         # Plot the theta trend over time
-        ax2.plot(t, q[:,0], '-', lw=2, color = '#047FFF', label = '1st mass \u03B8(t)')
-        ax2.plot(t, q[:,2], '-', lw=2, color = '#FF4B00', label = '2nd mass \u03B8(t)')
+        decimatedPlot(ax2, t, q[:,0], '-', lw=2, color = '#047FFF', label = '1st mass \u03B8(t)')
+        decimatedPlot(ax2, t, q[:,2], '-', lw=2, color = '#FF4B00', label = '2nd mass \u03B8(t)')
         
         # Plot the omega trend over time
-        ax3.plot(t, q[:,1], '-', lw=2, color = '#047FFF', label = '1st mass \u03C9(t)') 
-        ax3.plot(t, q[:,3], '-', lw=2, color = '#FF4B00', label = '2nd mass \u03C9(t)')
+        decimatedPlot(ax3, t, q[:,1], '-', lw=2, color = '#047FFF', label = '1st mass \u03C9(t)')
+        decimatedPlot(ax3, t, q[:,3], '-', lw=2, color = '#FF4B00', label = '2nd mass \u03C9(t)')
 
         # Add a legend to the figures using the addLegend() function in the figureSetup.py module
         addLegend(n, ax1, ax2, ax3)
@@ -164,13 +167,21 @@ def doublePendulum(n):
         # Create the potential energy bar
         rect2 = plt.Rectangle((0, -1), 1, 1, fill=True, color='white', ec='black')
         ax5.add_patch(rect2)
+
+        # Create the kinetic and potential energy bars, normalized once for the whole trajectory
+        scale = energyScale(E, U)
+        kineticBar = energyBar(ax4, 'red')
+        potentialBar = energyBar(ax5, 'blue')
         
-        # Animate the plots using functions in the animationModule.py module
-        anim1 = animation.FuncAnimation(fig, doublePendulumAnimation, frames=len(t), fargs=[x, y, pendulumTraces, masses, pendulumSegments, texts, T, h], interval=h, blit=True)
-        anim2 = animation.FuncAnimation(fig, kineticEnergyAnimation, frames=len(t), fargs=[ax4, E, U], interval=h, blit=True)
-        anim3 = animation.FuncAnimation(fig, potentialEnergyAnimation, frames=len(t), fargs=[ax5, E, U], interval=h, blit=True)
-        anim4 = animation.FuncAnimation(fig, doublePendulumTrend, frames=len(t), fargs=['theta', t, q, thetaTraces], interval=h, blit=True)
-        anim5 = animation.FuncAnimation(fig, doublePendulumTrend, frames=len(t), fargs=['omega', t, q, omegaTraces], interval=h, blit=True)
+        # Animate all the plots with a single controller from the animationModule.py module: one callback and one blit per frame,
+        # skipping frames to play the simulation in real time
+        animator = PendulumAnimator(fig, len(t), h)
+        animator.add(doublePendulumAnimation, x, y, pendulumTraces, masses, pendulumSegments, texts, T, h)
+        animator.add(kineticEnergyAnimation, kineticBar, E, scale)
+        animator.add(potentialEnergyAnimation, potentialBar, U, scale)
+        animator.add(doublePendulumTrend, 'theta', t, q, thetaTraces)
+        animator.add(doublePendulumTrend, 'omega', t, q, omegaTraces)
+        anim = animator.start()
 
 
     plt.show()
\ No newline at end of file
@@ -13,17 +13,50 @@
 
 # Python module
 import numpy as np
-       
+
+# Custom made modules
+from profiling import profiled
+from pendulumSystem import PendulumSystem
+
+
+def packState(components, out=None):
+    '''Stacks the components of the time derivative of the state into an array of the shape of q, or into out if given'''
+
+    if out is None:
+        return np.array(components).T
+
+    for k, component in enumerate(components):
+        out[..., k] = component
+
+    return out
+
+
+# All the equations of motion broadcast over a leading batch axis:
+# q can either be a single state of shape (2n,) or an ensemble of states of shape (batch, 2n),
+# and every mass/length in par can either be a scalar or an array of shape (batch,) holding one value per member.
+# The arithmetic follows the dtype of q and of the parameters: with float32 states and parameters (see castParameters() in precision.py)
+# every intermediate array is float32, since the Python float constants do not promote it.
+# par is either the parameters list or a PendulumSystem, whose gravity and derived constants are read instead of being recomputed at every call.
+# Transposing q moves the state components on the first axis, so that q[k] is a scalar for a single state
+# and a (batch,) array for an ensemble; the result is transposed back to the original layout,
+# or written into out if given, an array of the shape of q (see stepInPlace() in rungeKutta4.py).
 
 # q[0] = theta1
 # q[1] = omega1
-def simplePendulumEq(q, t, par):
+@profiled('equationsMotion.simplePendulumEq')
+def simplePendulumEq(q, t, par, out=None):
     '''Simple Pendulum equation of motion'''
 
+    # Put the state components on the first axis (see module note above)
+    q = q.T
+
     # Define relevant parameters
-    g = 9.81
-    m1 = par[0]
-    l1 = par[1]
+    if isinstance(par, PendulumSystem):
+        g, (m1,), (l1,) = par.g, par.m, par.l
+    else:
+        g = 9.81
+        m1 = par[0]
+        l1 = par[1]
 
     # ThetaDot equation
     td = q[1]
@@ -31,22 +64,29 @@ def simplePendulumEq(q, t, par):
     # OmegaDot equation
     od = -m1*(g/l1)*np.sin(q[0])
 
-    return np.array([td, od])
+    return packState([td, od], out)
 
 
 #q[0] = theta1
 #q[1] = omega1
 #q[2] = theta2
 #q[3] = omega2
-def doublePendulumEq(q, t, par):
+@profiled('equationsMotion.doublePendulumEq')
+def doublePendulumEq(q, t, par, out=None):
     '''Double Pendulum equation of motion'''
 
+    # Put the state components on the first axis (see module note above)
+    q = q.T
+
     # Define relevant parameters
-    g = 9.81
-    m1 = par[0]
-    m2 = par[1]
-    l1 = par[2]
-    l2 = par[3]
+    if isinstance(par, PendulumSystem):
+        g, (m1, m2), (l1, l2) = par.g, par.m, par.l
+    else:
+        g = 9.81
+        m1 = par[0]
+        m2 = par[1]
+        l1 = par[2]
+        l2 = par[3]
 
     # ThetaDot equations
     td1 = q[1]
@@ -56,7 +96,7 @@ def doublePendulumEq(q, t, par):
     od1 = (-g * (2*m1 + m2) * np.sin(q[0]) -m2 * g * np.sin(q[0]-2*q[2]) -2 * np.sin(q[0]-q[2]) * m2 * (l2 * q[3]**2 + l1 * q[1]**2 * np.cos(q[0]-q[2]))) / (l1 * (2*m1 + m2 - m2*np.cos(2*q[0]-2*q[2])))
     od2 = (2 * np.sin(q[0]-q[2]) * ( l1 * q[1]**2 * (m1+m2) + g * (m1+m2) * np.cos(q[0]) + m2 * l2 * q[3]**2 * np.cos(q[0]-q[2]))) / (l2 * (2*m1 + m2 - m2*np.cos(2*q[0]-2*q[2])))
 
-    return np.array([td1, od1, td2, od2])
+    return packState([td1, od1, td2, od2], out)
 
 
 #q[0] = theta0
@@ -65,22 +105,30 @@ def doublePendulumEq(q, t, par):
 #q[3] = omega1
 #q[4] = theta2
 #q[5] = omega2
-def triplePendulumEq(q, t, par):
+@profiled('equationsMotion.triplePendulumEq')
+def triplePendulumEq(q, t, par, out=None):
     '''Triple Pendulum equation of motion'''
 
-    # Define relevant parameters
-    g = 9.81
-    m1 = par[0]
-    m2 = par[1]
-    m3 = par[2]
-    l1 = par[3]
-    l2 = par[4]
-    l3 = par[5]
-
-    # Define useful mass combinations
-    m12 = m2 + m3
-    m012 = m1 + m2 + m3
-    mf = m012/4
+    # Put the state components on the first axis (see module note above)
+    q = q.T
+
+    # Define relevant parameters and useful mass combinations, precomputed by a PendulumSystem
+    if isinstance(par, PendulumSystem):
+        g, (m1, m2, m3), (l1, l2, l3) = par.g, par.m, par.l
+        m012, m12, _ = par.below
+        mf = par.mf
+    else:
+        g = 9.81
+        m1 = par[0]
+        m2 = par[1]
+        m3 = par[2]
+        l1 = par[3]
+        l2 = par[4]
+        l3 = par[5]
+
+        m12 = m2 + m3
+        m012 = m1 + m2 + m3
+        mf = m012/4
 
     # Define useful sines 
     sin0 = np.sin(q[0])
@@ -129,4 +177,4 @@ def triplePendulumEq(q, t, par):
     od2 = ( -m3 * r1 * m012 * od2_1 * r2 - ( m3 * ( r1*cos01 + r2*cos02 ) * r1 - ( m3*r1**2 + m12*r3*r2 ) * cos01 ) * od2_2 + m012*r3*r2*od2_3 ) / ( l2 * od1_7 * r2 )
     od3 = -( m12 * (od1_2) * (od3_1) + m12 * m012 * (od3_2) * r2 - r1*m012 * od3_3 ) / ( l3 * ( m3*r1**2 + m12*r3*r2 ) )
 
-    return np.array([td1, od1, td2, od2, td3, od3])
\ No newline at end of file
+    return packState([td1, od1, td2, od2, td3, od3], out)
\ No newline at end of file
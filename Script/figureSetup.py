@@ -311,6 +311,89 @@ def animatedFigure(n, q, par):
     return fig, ax1, ax2, ax3, ax4, ax5
 
 
+def lodIndices(x, y, bins, parametric):
+    '''Level of detail decimation: splits the samples into bins of consecutive samples and returns the sorted indices of the extremes of each bin,
+    min and max of y for a time series, min and max of both x and y for a parametric curve (e.g. a trajectory)'''
+
+    n = len(y)
+    k = n // bins
+    m = k * bins
+
+    # Extremes of the full bins
+    offsets = np.arange(bins) * k
+    series = (x, y) if parametric else (y,)
+    extremes = [np.array([0, n-1])]
+    for s in series:
+        S = s[:m].reshape(bins, k)
+        extremes += [S.argmin(axis=1) + offsets, S.argmax(axis=1) + offsets]
+
+        # Extremes of the last partial bin
+        if m < n:
+            extremes.append(np.array([m + np.argmin(s[m:]), m + np.argmax(s[m:])]))
+
+    return np.unique(np.concatenate(extremes))
+
+
+class DecimatedLine:
+    '''Line showing a huge series through a level of detail layer: only the extremes of the samples falling in each pixel are drawn,
+    and the series is decimated again whenever the axes limits change (e.g. zooming), so that plots of very long runs stay responsive.
+    x must be increasing (e.g. time) unless parametric is True (e.g. a trajectory)'''
+
+    def __init__(self, ax, x, y, *args, parametric=False, **kwargs):
+        self.ax = ax
+        self.x = np.ravel(x)
+        self.y = np.ravel(y)
+        self.parametric = parametric
+
+        # Empty line, filled by update()
+        self.line, = ax.plot([], [], *args, **kwargs)
+
+        # Decimate again when the limits change (the callbacks hold a reference to the line)
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+        if parametric:
+            ax.callbacks.connect('ylim_changed', lambda ax: self.update())
+
+        self.update()
+
+    def update(self):
+        '''Decimates the samples in view down to the size in pixels of the axes'''
+
+        (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        bins = max(1, int(self.ax.bbox.width + self.ax.bbox.height)) if self.parametric else max(1, int(self.ax.bbox.width))
+
+        # Time series: the samples in view are a contiguous range (one more on each side to reach the edges)
+        if not self.parametric:
+            i0 = max(np.searchsorted(self.x, x0) - 1, 0)
+            i1 = min(np.searchsorted(self.x, x1) + 1, len(self.x))
+            x, y = self.x[i0:i1], self.y[i0:i1]
+            if len(y) > 4 * bins:
+                idx = lodIndices(x, y, bins, False)
+                x, y = x[idx], y[idx]
+            self.line.set_data(x, y)
+            return
+
+        # Parametric curve: samples in view (with their neighbours, so that the segments crossing the edges are drawn)
+        inside = (self.x >= x0) & (self.x <= x1) & (self.y >= y0) & (self.y <= y1)
+        inside[1:] |= inside[:-1]
+        inside[:-1] |= inside[1:]
+        visible = np.flatnonzero(inside)
+        if len(visible) > 4 * bins:
+            visible = visible[lodIndices(self.x[visible], self.y[visible], bins, True)]
+
+        # Break the line where the curve leaves the view, so that separate passes are not joined
+        x = self.x[visible]
+        y = self.y[visible]
+        passes = np.cumsum(~inside)[visible]
+        gaps = np.flatnonzero(np.diff(passes)) + 1
+        self.line.set_data(np.insert(x, gaps, np.nan), np.insert(y, gaps, np.nan))
+
+
+def decimatedPlot(ax, x, y, *args, parametric=False, **kwargs):
+    '''Plots a huge series like ax.plot(x, y, *args, **kwargs) through the DecimatedLine level of detail layer, returns the line'''
+
+    return DecimatedLine(ax, x, y, *args, parametric=parametric, **kwargs).line
+
+
 def addLegend(n, ax1, ax2, ax3):
     '''Adds the plot legend depending on the type of system'''
 
@@ -0,0 +1,137 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    FLIP MAP MODULE
+
+    The following code computes the "time to first flip" fractal of the double and triple pendulum:
+    each pixel is a pendulum released from rest with initial angles (theta1, theta2), coloured by the time at which one of its segments first flips over
+"""
+
+# Python modules
+import numpy as np
+
+# Custom made modules
+from equationsMotion import doublePendulumEq, triplePendulumEq
+from computeEnergy import chainEnergy
+from pendulumSystem import PendulumSystem
+from precision import precisionPolicy
+from rungeKutta4 import stageBuffers, stepInPlace
+
+
+# Equations of motion of the supported systems
+EQUATIONS = {2: doublePendulumEq, 3: triplePendulumEq}
+
+
+def neverFlips(q0, masses, lengths, g=9.81):
+    '''True for the initial conditions whose energy is too low for any segment to ever flip over, with gravity g'''
+
+    m = np.asarray(masses, dtype=float)
+    l = np.asarray(lengths, dtype=float)
+
+    # Potential energy weights: mass hanging below each rope times its length
+    w = np.cumsum(m[::-1])[::-1] * l
+
+    # Lowest energy with segment k upside down (theta_k = pi) and all the other segments hanging down
+    Umin = g * (2*w - np.sum(w))
+
+    # Energy is conserved: below every threshold no segment can reach the upside down position
+    E, U, T = chainEnergy(q0, m, l, g=g)
+    return T < np.amin(Umin)
+
+
+def flipTimes(n, theta1, theta2, tmax, h, masses, lengths, precision='double', g=9.81):
+    '''Time to first flip of the pendulums released from rest at the angles theta1, theta2 (arrays of the same shape, in rad).
+    All the pendulums are integrated together and the ones which flipped are dropped, so the work shrinks as the map fills up.
+    Pendulums not flipping before tmax get tmax, g is the gravity. No trajectory is stored, so of the precision policy only the dtype of the steps matters'''
+
+    f = EQUATIONS[n]
+    storage, compute = precisionPolicy(precision)
+    par = PendulumSystem(masses, lengths, np.zeros(2*n), g=g, dtype=compute)
+    hc = compute(h)
+
+    # Initial conditions: from rest, the third segment (if any) hanging down
+    q = np.zeros((theta1.size, 2*n), dtype=compute)
+    q[:, 0] = theta1.ravel()
+    q[:, 2] = theta2.ravel()
+
+    # Flip times, tmax unless a flip happens
+    times = np.full(theta1.size, tmax, dtype=float)
+
+    # Active set: pixels still running, skipping the ones which can never flip
+    active = np.flatnonzero(~neverFlips(q, masses, lengths, g))
+    q = q[active]
+
+    # Stage buffers of the in-place steps, the first rows are used as the active set shrinks
+    full = stageBuffers(q.shape, compute)
+    buffers = full
+
+    t = 0.0
+    while len(active) and t < tmax:
+
+        # Runge-Kutta 4 step of the whole active set
+        stepInPlace(f, q, t, hc, par, buffers)
+        t += h
+
+        # A segment flips when its angle goes past +-pi
+        flipped = np.any(np.abs(q[:, ::2]) > np.pi, axis=1)
+
+        # Record the flip times and drop the flipped pixels from the active set
+        if np.any(flipped):
+            times[active[flipped]] = t
+            active = active[~flipped]
+            q = q[~flipped]
+            buffers = tuple(b[:len(q)] for b in full)
+
+    return times.reshape(theta1.shape)
+
+
+def flipMap(n, width, height, tmax=100, h=0.01, masses=None, lengths=None, tile=256, fname=None, precision='double', g=9.81):
+    '''Computes the flip time map of the double (n=2) or triple (n=3) pendulum on a width x height grid of initial angles in [-pi, pi] x [-pi, pi].
+    The map is computed one tile x tile block at a time; with fname it is written tile by tile to a memory-mapped .npy file, so that very large maps never sit in memory.
+    precision='single' integrates the pixels in float32, g is the gravity'''
+
+    # Unitary masses and lengths by default
+    masses = np.ones(n) if masses is None else masses
+    lengths = np.ones(n) if lengths is None else lengths
+
+    # Initial angles of the columns (theta1) and of the rows (theta2), at the center of each pixel
+    th1 = -np.pi + (np.arange(width) + 0.5) * 2*np.pi / width
+    th2 = np.pi - (np.arange(height) + 0.5) * 2*np.pi / height
+
+    # Output map, on disk if a file name is given
+    if fname is None:
+        image = np.empty((height, width), dtype=np.float32)
+    else:
+        image = np.lib.format.open_memmap(fname, mode='w+', dtype=np.float32, shape=(height, width))
+
+    # Fill the map tile by tile
+    for r in range(0, height, tile):
+        for c in range(0, width, tile):
+            T1, T2 = np.meshgrid(th1[c:c+tile], th2[r:r+tile])
+            image[r:r+tile, c:c+tile] = flipTimes(n, T1, T2, tmax, h, masses, lengths, precision, g)
+
+        # Make the completed rows of tiles persistent
+        if fname is not None:
+            image.flush()
+
+    return image
+
+
+def saveMapImage(image, fname, tmax=None, cmap='magma'):
+    '''Saves the flip time map as a picture, on a logarithmic colour scale with the pixels which never flip in black'''
+
+    import matplotlib.pyplot as plt
+
+    tmax = tmax or np.amax(image)
+
+    # Logarithm of the flip times, the pixels which never flipped are masked
+    logt = np.ma.masked_greater_equal(np.log10(np.maximum(image, 1e-3)), np.log10(tmax))
+
+    colormap = plt.get_cmap(cmap).copy()
+    colormap.set_bad('black')
+    plt.imsave(fname, logt, cmap=colormap)
@@ -0,0 +1,94 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    IMPORT TIME MODULE
+
+    The following code measures the import time of the modules and checks that the compute-only ones
+    do not load the plotting, symbolic and notebook packages, which must only be imported when used
+"""
+
+# Python modules
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+# Packages which are slow to import: compute-only modules must not load them at import time
+HEAVY = ('matplotlib', 'sympy', 'scipy', 'IPython', 'numba')
+
+# Directories of the modules
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LAGRANGE_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'LagrangesEquations')
+
+# Modules checked by the guard
+MODULES = [
+    'equationsMotion', 'rungeKutta4', 'dormandPrince', 'variationalIntegrator', 'compiledBackend', 'solvers',
+    'computeEnergy', 'computeCoordinates', 'nLinkPendulum', 'trajectoryStore', 'parameterSweep', 'flipMap', 'lyapunov', 'precision', 'pendulumSystem',
+    'batchRun', 'simplePendulum', 'doublePendulum', 'triplePendulum', 'MAIN', 'TriplePendulum_Code'
+    ]
+
+
+def importTime(module):
+    '''Imports the module in a fresh interpreter, returns its cumulative import time (in s) and the heavy packages it loaded'''
+
+    code = 'import sys, json; import {0}; print(json.dumps(sorted(sys.modules.keys() & {1!r})))'.format(module, set(HEAVY))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SCRIPT_DIR, LAGRANGE_DIR, os.environ.get('PYTHONPATH', '')]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError('Importing %s failed:\n%s' % (module, result.stderr))
+
+    # The -X importtime report lists "self | cumulative | name" in microseconds, the top level module has no indentation
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.split('|')[-1].rstrip() == ' ' + module:
+            cumulative = int(line.split('|')[1])
+
+    loaded = json.loads(result.stdout.splitlines()[-1])
+    return cumulative * 1e-6, loaded
+
+
+def main(argv=None):
+    '''Prints the import time of the modules, returns 1 if a module loads a heavy package or exceeds the time budget'''
+
+    parser = argparse.ArgumentParser(description='Import time benchmark and guard')
+    parser.add_argument('modules', nargs='*', default=MODULES, help='modules to check (all by default)')
+    parser.add_argument('--budget', type=float, help='maximum import time of each module, in ms')
+    parser.add_argument('--json', help='write the measured times to this file')
+    args = parser.parse_args(argv)
+
+    # numpy is imported by every module: its import time is the floor
+    floor, _ = importTime('numpy')
+    print('%-22s %9.1f ms' % ('numpy (floor)', 1e3*floor))
+
+    report = {}
+    failed = False
+    for module in args.modules:
+        seconds, loaded = importTime(module)
+        report[module] = {'seconds': seconds, 'heavy': loaded}
+
+        problems = []
+        if loaded:
+            problems.append('loads ' + ', '.join(loaded))
+        if args.budget is not None and 1e3*seconds > args.budget:
+            problems.append('over budget')
+        failed = failed or bool(problems)
+
+        print('%-22s %9.1f ms  %s' % (module, 1e3*seconds, '; '.join(problems) or 'ok'))
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=1)
+
+    return 1 if failed else 0
+
+
+# Call the main function when running the script
+if __name__ == "__main__":
+    sys.exit(main())
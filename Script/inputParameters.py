@@ -15,13 +15,13 @@
 import numpy as np
 
 
-def inputParameters(n):
-    '''Reads parameters from keyboard and returns the list of parameters'''
+def inputParameters(n, dtype=np.float64):
+    '''Reads parameters from keyboard and returns the list of parameters, masses, lengths and initial conditions of the given dtype'''
 
     # Initialize the array p to hold masses and lengths
-    p = np.zeros(2*n)
+    p = np.zeros(2*n, dtype=dtype)
     # Initialize the array q to hold initial conditions
-    q0 = np.zeros(2*n)
+    q0 = np.zeros(2*n, dtype=dtype)
     # Initialize the array simTime to hold information time
     simTime = np.zeros(3)
 
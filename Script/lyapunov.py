@@ -0,0 +1,86 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    LYAPUNOV MODULE
+
+    The following code estimates the Lyapunov spectrum of the system, integrating the variational equations
+    alongside the equations of motion and re-orthonormalizing the tangent vectors with QR decompositions
+"""
+
+# Python module
+import numpy as np
+
+# Custom made module
+from pendulumSystem import PendulumSystem
+
+
+def tangentField(f, q, Y, t, par, eps):
+    '''Returns the time derivatives of the states q (batch, 2n) and of their tangent vectors Y (batch, 2n, k).
+    The Jacobian-vector products J(q) Y come from a complex step: f(q + i eps y) = f(q) + i eps J(q) y up to eps^2,
+    exact to machine precision and free from the cancellation of finite differences'''
+
+    batch, dim, k = Y.shape
+
+    # One complex state per tangent vector, flattened on the batch axis
+    z = q[:, None, :] + 1j * eps * np.swapaxes(Y, 1, 2)
+    fz = f(z.reshape(batch * k, dim), t, par).reshape(batch, k, dim)
+
+    # Real part: the equation of motion, imaginary part: the linearized one
+    return fz[:, 0].real, np.swapaxes(fz.imag, 1, 2) / eps
+
+
+def lyapunovSpectrum(f, par, k=None, renorm=10, eps=1e-20):
+    '''Estimates the k largest Lyapunov exponents (all of them by default) of every member of an ensemble, in 1/s.
+    f is a batched equation of motion of the equationsMotion.py module, written with numpy functions only so that it accepts complex states;
+    par is the parameters list of RungeKutta4Ensemble, with initial conditions of shape (batch, 2n).
+    The tangent vectors are integrated with Runge-Kutta 4 alongside the states and re-orthonormalized every renorm steps.
+    Returns the exponents of shape (batch, k), in decreasing order'''
+
+    # Unpack the relevant parameters: initial conditions and time constraints
+    q0 = np.atleast_2d(np.asarray(par[-4], dtype=float))
+    t0 = float(par[-3])
+    tf = float(par[-2])
+    n = int(par[-1])
+    batch, dim = q0.shape
+    k = dim if k is None else k
+
+    # Masses and lengths of each member are repeated for each of its tangent vectors (keeping the gravity of a PendulumSystem)
+    if isinstance(par, PendulumSystem):
+        par = PendulumSystem([np.repeat(m, k) if np.ndim(m) else m for m in par.m], [np.repeat(l, k) if np.ndim(l) else l for l in par.l], q0, t0, tf, n, par.g)
+    else:
+        par = [np.repeat(p, k) if np.ndim(p) else p for p in par[:-4]]
+
+    # Step size
+    h = (tf - t0) / n
+
+    # Initial states and orthonormal tangent vectors
+    q = q0.copy()
+    Y = np.tile(np.eye(dim, k), (batch, 1, 1))
+
+    # Accumulated logarithms of the stretching factors
+    logs = np.zeros((batch, k))
+
+    t = t0
+    for i in range(1, n + 1):
+
+        # Runge-Kutta 4 step of states and tangent vectors
+        k1q, k1Y = tangentField(f, q, Y, t, par, eps)
+        k2q, k2Y = tangentField(f, q + 0.5*h*k1q, Y + 0.5*h*k1Y, t + 0.5*h, par, eps)
+        k3q, k3Y = tangentField(f, q + 0.5*h*k2q, Y + 0.5*h*k2Y, t + 0.5*h, par, eps)
+        k4q, k4Y = tangentField(f, q + h*k3q, Y + h*k3Y, t + h, par, eps)
+        q = q + h * (k1q + 2*(k2q + k3q) + k4q) / 6
+        Y = Y + h * (k1Y + 2*(k2Y + k3Y) + k4Y) / 6
+        t = t0 + i*h
+
+        # Re-orthonormalize the tangent vectors, storing how much they stretched
+        if i % renorm == 0 or i == n:
+            Y, R = np.linalg.qr(Y)
+            logs += np.log(np.abs(np.diagonal(R, axis1=1, axis2=2)))
+
+    # Exponents in decreasing order (the QR order converges to it only over long runs)
+    return np.sort(logs / (t - t0), axis=1)[:, ::-1]
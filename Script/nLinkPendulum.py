@@ -0,0 +1,234 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    N-LINK PENDULUM MODULE
+
+    The following code derives the equations of motion of a pendulum made of any number n of segments,
+    generates the Python code of its mass matrix and forcing and caches it on disk
+"""
+
+# Python modules
+import os
+import importlib.util
+from importlib.metadata import version
+import numpy as np
+
+# Custom made module
+from pendulumSystem import PendulumSystem
+
+
+# Version of the generated code, to be increased whenever the generator changes
+CODEGEN_VERSION = 1
+
+# Directory holding the generated modules, it can be changed with the PENDULUM_CACHE_DIR environment variable
+CACHE_DIR = os.environ.get('PENDULUM_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'triplePendulum'))
+
+# Generated modules already loaded in this session
+loadedModules = {}
+
+
+def deriveEquations(n):
+    '''Derives with sympy the mass matrix and the forcing of the pendulum made of n segments, returns them with the symbols they depend on'''
+
+    import sympy as sp
+
+    # Angles, angular velocities, masses, lengths and gravity
+    q = sp.symbols('q:{0}'.format(n))
+    u = sp.symbols('u:{0}'.format(n))
+    m = sp.symbols('m:{0}'.format(n))
+    l = sp.symbols('l:{0}'.format(n))
+    g = sp.Symbol('g')
+
+    # Mass hanging below both rope i and rope j
+    mu = [[sum(m[max(i, j):]) for j in range(n)] for i in range(n)]
+
+    # Kinetic and potential energy of the chain, the same Lagrangian of integrate_pendulum() in LagrangesEquations/TriplePendulum_Code.py
+    T = sum(mu[i][j] * l[i] * l[j] * sp.cos(q[i] - q[j]) * u[i] * u[j] for i in range(n) for j in range(n)) / 2
+    U = -g * sum(mu[i][i] * l[i] * sp.cos(q[i]) for i in range(n))
+    L = T - U
+
+    # Lagrange equations M(q) * du/dt = F(q, u)
+    dLdu = [sp.diff(L, ui) for ui in u]
+    M = sp.Matrix(n, n, lambda i, j: sp.diff(dLdu[i], u[j]))
+    F = sp.Matrix([sp.diff(L, q[i]) - sum(sp.diff(dLdu[i], q[j]) * u[j] for j in range(n)) for i in range(n)])
+
+    return M, F, q, u, m, l, g
+
+
+def generateSource(n):
+    '''Generates the source code of a Python module computing the mass matrix and the forcing of the pendulum made of n segments'''
+
+    import sympy as sp
+
+    M, F, q, u, m, l, g = deriveEquations(n)
+
+    # Eliminate the common subexpressions shared by the entries
+    entries = [M[i, j] for i in range(n) for j in range(i, n)] + list(F)
+    replacements, reduced = sp.cse(entries)
+
+    # Header: the state y is ordered as in the Script modules, [theta1, omega1, theta2, omega2, ...]
+    lines = [
+        '# Generated by nLinkPendulum.py for a pendulum made of %d segments, do not edit' % n,
+        'import math',
+        '',
+        '',
+        'def massForcing(y, m, l, g, M, F):',
+        '    \'\'\'Fills the mass matrix M and the forcing F of the pendulum in the state y\'\'\'',
+        ]
+
+    # Unpack state and parameters
+    for i in range(n):
+        lines.append('    %s = y[%d]' % (q[i], 2*i))
+        lines.append('    %s = y[%d]' % (u[i], 2*i+1))
+        lines.append('    %s = m[%d]' % (m[i], i))
+        lines.append('    %s = l[%d]' % (l[i], i))
+
+    # Common subexpressions
+    for symbol, expression in replacements:
+        lines.append('    %s = %s' % (symbol, sp.pycode(expression, fully_qualified_modules=True)))
+
+    # Symmetric mass matrix
+    k = 0
+    for i in range(n):
+        for j in range(i, n):
+            lines.append('    M[%d, %d] = %s' % (i, j, sp.pycode(reduced[k], fully_qualified_modules=True)))
+            if i != j:
+                lines.append('    M[%d, %d] = M[%d, %d]' % (j, i, i, j))
+            k += 1
+
+    # Forcing
+    for i in range(n):
+        lines.append('    F[%d] = %s' % (i, sp.pycode(reduced[k+i], fully_qualified_modules=True)))
+
+    return '\n'.join(lines) + '\n'
+
+
+def cachePath(n):
+    '''Path of the generated module of the pendulum made of n segments, keyed by the sympy version and the generator version'''
+
+    tag = version('sympy').replace('.', '_')
+    return os.path.join(CACHE_DIR, 'nlink_n%d_sympy%s_v%d.py' % (n, tag, CODEGEN_VERSION))
+
+
+def loadEquations(n):
+    '''Returns the generated module of the pendulum made of n segments, generating it and writing it to the cache the first time'''
+
+    # Already loaded in this session
+    if n in loadedModules:
+        return loadedModules[n]
+
+    path = cachePath(n)
+
+    # Generate the module if it is not in the cache, writing it to a temporary file first so that a crash never leaves a broken module
+    if not os.path.exists(path):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'w') as file:
+            file.write(generateSource(n))
+        os.replace(tmp, path)
+
+    # Import the generated module
+    spec = importlib.util.spec_from_file_location('nlink_n%d' % n, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    loadedModules[n] = module
+    return module
+
+
+def tensionAccelerations(theta, omega, masses, lengths, g, work):
+    '''Angular accelerations of the chain in O(n) operations through the tensions of the ropes, as chain_accelerations() in LagrangesEquations/TriplePendulum_Code.py,
+    using only the preallocated arrays of work (built by nLinkPendulumEq): they are written into its acc array, which is returned'''
+
+    gtsv, invm, cos_next, sin_next, tmp, lower, diag, upper, rhs, acc = work
+
+    # Inverse masses, sine and cosine of the angle between consecutive ropes
+    np.divide(1, masses, out=invm)
+    np.subtract(theta[1:], theta[:-1], out=tmp)
+    np.cos(tmp, out=cos_next)
+    np.sin(tmp, out=sin_next)
+
+    # Symmetric tridiagonal system of the tensions, solved by the LAPACK tridiagonal solver (which overwrites its arguments)
+    np.negative(invm, out=diag)
+    diag[1:] -= invm[:-1]
+    np.multiply(cos_next, invm[:-1], out=upper)
+    lower[:] = upper
+    np.multiply(omega, omega, out=rhs)
+    rhs *= lengths
+    np.negative(rhs, out=rhs)
+    rhs[0] -= g * np.cos(theta[0])
+    if len(diag) > 1:
+        tension = gtsv(lower, diag, upper, rhs, True, True, True, True)[3]
+    else:
+        tension = np.divide(rhs, diag, out=rhs)
+
+    # Acceleration of mass k relative to mass k-1 perpendicular to rope k gives the angular acceleration
+    acc[:] = 0
+    np.multiply(tension[1:], sin_next, out=tmp)
+    tmp *= invm[:-1]
+    acc[:-1] += tmp
+    np.multiply(tension[:-1], sin_next, out=tmp)
+    tmp *= invm[:-1]
+    acc[1:] -= tmp
+    acc[0] -= g * np.sin(theta[0])
+    acc /= lengths
+
+    return acc
+
+
+def nLinkPendulumEq(n, method='tridiagonal'):
+    '''Returns the equation of motion f(q, t, par, out=None) of the pendulum made of n segments, to be used with RungeKutta4 and the other solvers.
+    The parameters list is the same of the Script modules: [masses, lengths, initial conditions, time constraints], or a PendulumSystem (whose gravity is used).
+    With method 'tridiagonal' the accelerations are solved in O(n) through the tensions of the ropes, with 'cholesky' the generated mass matrix
+    is factorized; in both cases every buffer is allocated once here and reused at each call'''
+
+    from scipy.linalg import cho_factor, cho_solve, get_lapack_funcs
+
+    if method not in ('tridiagonal', 'cholesky'):
+        raise ValueError('Method "%s" not supported, choose "tridiagonal" or "cholesky"' % method)
+
+    # Preallocated masses, lengths and buffers of the solver
+    m = np.empty(n)
+    l = np.empty(n)
+    if method == 'tridiagonal':
+        gtsv, = get_lapack_funcs(('gtsv',), (m,))
+        work = (gtsv, np.empty(n), np.empty(n-1), np.empty(n-1), np.empty(n-1), np.empty(n-1), np.empty(n), np.empty(n-1), np.empty(n), np.empty(n))
+    else:
+        massForcing = loadEquations(n).massForcing
+        M = np.empty((n, n))
+        F = np.empty(n)
+
+    def f(q, t, par, out=None):
+        '''N-link Pendulum equation of motion'''
+
+        # Unpack masses, lengths and gravity
+        if isinstance(par, PendulumSystem):
+            g = par.g
+            m[:] = par.masses
+            l[:] = par.lengths
+        else:
+            g = 9.81
+            m[:] = par[:n]
+            l[:] = par[n:2*n]
+
+        if out is None:
+            out = np.empty(2*n)
+
+        # ThetaDot equations
+        out[::2] = q[1::2]
+
+        # OmegaDot equations
+        if method == 'tridiagonal':
+            out[1::2] = tensionAccelerations(q[::2], q[1::2], m, l, g, work)
+        else:
+            massForcing(q, m, l, g, M, F)
+            out[1::2] = cho_solve(cho_factor(M, overwrite_a=True, check_finite=False), F, overwrite_b=True, check_finite=False)
+
+        return out
+
+    return f
@@ -0,0 +1,193 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    PARAMETER SWEEP MODULE
+
+    The following code integrates a whole grid of initial conditions, masses and lengths,
+    splitting it into work units shared among a pool of processes
+"""
+
+# Python modules
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+# Custom made modules
+from rungeKutta4 import RungeKutta4Ensemble, inPlace, stageBuffers, stepInPlace
+from precision import precisionPolicy, castParameters
+
+
+def parameterGrid(n, axes, masses=1, lengths=1, q0=0):
+    '''Builds the grid of the sweep for the system made of n segments.
+    axes maps the swept quantities to their values: "theta1".."thetan" and "omega1".."omegan" (in deg and deg/s, as in inputParameters), "m1".."mn" and "l1".."ln".
+    Quantities not swept take the value of masses, lengths and q0 (in rad). Returns the (points, n) masses, (points, n) lengths and (points, 2n) initial conditions'''
+
+    # Cartesian product of the swept values, in C order (the last axis runs fastest)
+    names = list(axes)
+    mesh = np.meshgrid(*[np.asarray(axes[name], dtype=float) for name in names], indexing='ij')
+    points = mesh[0].size if names else 1
+
+    # Start from the fixed values
+    M = np.empty((points, n))
+    L = np.empty((points, n))
+    Q0 = np.empty((points, 2*n))
+    M[:] = masses
+    L[:] = lengths
+    Q0[:] = q0
+
+    # Fill the swept columns
+    for name, values in zip(names, mesh):
+        values = values.ravel()
+        if name.startswith('theta'):
+            Q0[:, 2*(int(name[5:])-1)] = np.radians(values)
+        elif name.startswith('omega'):
+            Q0[:, 2*(int(name[5:])-1)+1] = np.radians(values)
+        elif name.startswith('m'):
+            M[:, int(name[1:])-1] = values
+        elif name.startswith('l'):
+            L[:, int(name[1:])-1] = values
+        else:
+            raise ValueError('Unknown sweep axis "%s"' % name)
+
+    return M, L, Q0
+
+
+def finalState(q, t):
+    '''Default reduction of a work unit: the state of each member at the final time'''
+
+    return q[-1]
+
+
+def finalEnsembleState(f, par, precision='double'):
+    '''Final state of the ensemble integrated as by RungeKutta4Ensemble (same steps, same result as its q[-1]),
+    advancing it in place without storing the trajectory'''
+
+    # Dtypes of the result and of the steps, parameters converted to the dtype of the steps
+    storage, compute = precisionPolicy(precision)
+    par = castParameters(par, compute)
+
+    # Same time grid of RungeKutta4Ensemble
+    t = np.linspace(int(par[-3]), int(par[-2]), int(par[-1])+1)
+    h = compute(t[1]-t[0])
+
+    # Advance the state in place, reusing the same stage buffers at every step
+    f = inPlace(f)
+    qi = np.array(np.atleast_2d(par[-4]), dtype=compute)
+    buffers = stageBuffers(qi.shape, compute)
+    for i in range(int(par[-1])):
+        stepInPlace(f, qi, t[i], h, par, buffers)
+
+    return qi.astype(storage)
+
+
+def runUnit(f, n, M, L, Q0, t0, tf, nstep, reduce, precision='double'):
+    '''Integrates one work unit as a single ensemble, with the given precision policy, and reduces its trajectories'''
+
+    # Parameters list of the ensemble: one mass/length array per segment
+    par = [*M.T, *L.T, Q0, t0, tf, nstep]
+
+    # The default reduction only needs the final state: the (nstep+1, chunk, 2n) trajectory is never stored
+    if reduce is finalState:
+        return finalEnsembleState(f, par, precision)
+
+    q, t, h = RungeKutta4Ensemble(f, par, precision)
+
+    return reduce(q, t)
+
+
+def sweepManifest(f, grid, t0, tf, nstep, chunk, reduce, precision):
+    '''Description of the inputs of a sweep, saved with its units: the grid is identified by a hash of its arrays'''
+
+    digest = hashlib.sha256()
+    for array in grid:
+        array = np.ascontiguousarray(array, dtype=float)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+
+    return {
+        'grid': digest.hexdigest(),
+        'chunk': int(chunk),
+        't0': float(t0),
+        'tf': float(tf),
+        'nstep': int(nstep),
+        'f': '%s.%s' % (f.__module__, f.__qualname__),
+        'reduce': '%s.%s' % (reduce.__module__, reduce.__qualname__),
+        'precision': precision
+        }
+
+
+def runSweep(f, n, grid, t0, tf, nstep, outdir=None, chunk=256, workers=None, reduce=finalState, precision='double'):
+    '''Runs the sweep of the grid built by parameterGrid with the equation of motion f, returning the reduced results in the order of the grid.
+    The grid is split into work units of chunk points run on a pool of workers processes (all the cores by default), integrated with the precision policy of the precision.py module.
+    If outdir is given every completed unit is saved there, and running the sweep again only computes the missing units;
+    the inputs of the sweep are saved to outdir/manifest.json, and resuming a sweep with different inputs raises ValueError'''
+
+    M, L, Q0 = grid
+    points = len(Q0)
+    if points == 0:
+        raise ValueError('The grid of the sweep holds no points')
+    starts = list(range(0, points, chunk))
+
+    # Results of the units, indexed by the unit number
+    results = {}
+
+    def unitPath(k):
+        return os.path.join(outdir, 'unit_%06d.npy' % k)
+
+    # Resume: check that the units in outdir belong to the same sweep, then load the ones already completed by a previous run
+    if outdir is not None:
+        os.makedirs(outdir, exist_ok=True)
+        manifest = sweepManifest(f, grid, t0, tf, nstep, chunk, reduce, precision)
+        manifestPath = os.path.join(outdir, 'manifest.json')
+        if os.path.exists(manifestPath):
+            with open(manifestPath) as file:
+                previous = json.load(file)
+            if previous != manifest:
+                changed = sorted(key for key in set(manifest) | set(previous) if manifest.get(key) != previous.get(key))
+                raise ValueError('%s holds a sweep with different inputs (%s): use another directory' % (outdir, ', '.join(changed)))
+        elif any(name.startswith('unit_') for name in os.listdir(outdir)):
+            raise ValueError('%s holds units without a manifest: use another directory' % outdir)
+        else:
+            with open(manifestPath, 'w') as file:
+                json.dump(manifest, file, indent=1)
+
+        for k in range(len(starts)):
+            if os.path.exists(unitPath(k)):
+                results[k] = np.load(unitPath(k))
+
+    # Submit the missing units to the pool
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for k, start in enumerate(starts):
+            if k in results:
+                continue
+            s = slice(start, start + chunk)
+            futures[pool.submit(runUnit, f, n, M[s], L[s], Q0[s], t0, tf, nstep, reduce, precision)] = k
+
+        # Collect the units in order of completion, saving each one as soon as it is done (first to a temporary file, so that a crash never leaves a partial unit).
+        # A failed unit does not stop the others from being saved, its error is raised once all of them are done
+        error = None
+        for future in as_completed(futures):
+            k = futures[future]
+            try:
+                results[k] = future.result()
+            except Exception as exception:
+                error = error or exception
+                continue
+            if outdir is not None:
+                tmp = unitPath(k) + '.tmp.npy'
+                np.save(tmp, results[k])
+                os.replace(tmp, unitPath(k))
+
+    if error is not None:
+        raise error
+
+    # Stable order: units in grid order
+    return np.concatenate([results[k] for k in range(len(starts))])
@@ -0,0 +1,119 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    PENDULUM SYSTEM MODULE
+
+    The following code defines the PendulumSystem class, a typed description of a pendulum (or of a batch of pendulums)
+    holding masses, lengths, gravity, initial conditions and time grid, together with the constants derived from them,
+    and the mass weights and mass matrix of a chain of any number of segments
+"""
+
+# Python module
+import numpy as np
+
+
+def chainMasses(masses):
+    '''Returns the matrix of the masses hanging below both rope i and rope j'''
+
+    # Masses hanging below each rope
+    below = np.cumsum(np.asarray(masses, dtype=float)[::-1])[::-1]
+
+    # The mass below both ropes i and j is the one below the lowest of the two
+    idx = np.arange(len(below))
+    return below[np.maximum.outer(idx, idx)]
+
+
+def massMatrix(theta, mu, l):
+    '''Mass matrix of the chain for the angles theta'''
+
+    return mu * np.outer(l, l) * np.cos(np.subtract.outer(theta, theta))
+
+
+class PendulumSystem:
+    '''System made of n segments: masses and lengths (one value per segment, each a number or a (batch,) array for a batch of systems),
+    gravity g, initial conditions q0 (of shape (2n,) or (batch, 2n)) and time constraints from t0 to tf in nstep iterations.
+    The derived constants used by the equations of motion and by the energies are computed once here, instead of at every call.
+    The system can be used wherever a parameters list is expected: system[k] is the same element of [*masses, *lengths, q0, t0, tf, nstep].
+    Its attributes must not be modified, since the derived constants would not follow: make a new system instead'''
+
+    __slots__ = ('n', 'dtype', 'g', 'masses', 'lengths', 'q0', 't0', 'tf', 'nstep',
+                 'm', 'l', 'below', 'mf', 'mu', 'w', 'par')
+
+    def __init__(self, masses, lengths, q0, t0=0, tf=10, nstep=1000, g=9.81, dtype=np.float64):
+
+        self.dtype = np.dtype(dtype).type
+        self.g = self.dtype(g).item()
+
+        # Masses and lengths, one row per segment (numbers and (batch,) arrays can be mixed, numbers are broadcast to the batch)
+        self.masses = np.array(np.broadcast_arrays(*[np.asarray(m, dtype=self.dtype) for m in masses]))
+        self.lengths = np.array(np.broadcast_arrays(*[np.asarray(l, dtype=self.dtype) for l in lengths]))
+        self.n = len(self.masses)
+        if len(self.lengths) != self.n:
+            raise ValueError('%d masses and %d lengths given, one of each is needed per segment' % (self.n, len(self.lengths)))
+
+        # Initial conditions and time constraints, the same of the Runge-Kutta 4 integrators
+        self.q0 = np.asarray(q0, dtype=self.dtype)
+        if np.shape(self.q0)[-1] != 2*self.n:
+            raise ValueError('The initial conditions must hold %d values per system, got %d' % (2*self.n, np.shape(self.q0)[-1]))
+        self.t0 = t0
+        self.tf = tf
+        self.nstep = nstep
+
+        # Value of each segment: Python floats for a single system (faster than NumPy scalars, and weak types which keep the dtype of the state),
+        # (batch,) arrays for a batch of systems
+        self.m = tuple(m.item() if m.ndim == 0 else m for m in self.masses)
+        self.l = tuple(l.item() if l.ndim == 0 else l for l in self.lengths)
+
+        # Masses hanging below each rope (m1+m2+m3, m2+m3, m3 for the triple pendulum) and quarter of the total mass
+        self.below = tuple(sum(self.m[k:]) for k in range(self.n))
+        self.mf = self.below[0] / 4
+
+        # Mass matrix weights and potential energy weights of the energies, for a single system
+        if self.masses.ndim == 1 and self.lengths.ndim == 1:
+            idx = np.arange(self.n)
+            self.mu = np.asarray(self.below)[np.maximum.outer(idx, idx)]
+            self.w = np.asarray(self.below) * self.lengths
+        else:
+            self.mu = None
+            self.w = None
+
+        # Equivalent parameters list
+        self.par = (*self.m, *self.l, self.q0, t0, tf, nstep)
+
+    @classmethod
+    def fromParameters(cls, par, g=9.81, dtype=np.float64):
+        '''Builds the system described by a parameters list [*masses, *lengths, q0, t0, tf, nstep]'''
+
+        n = np.shape(par[-4])[-1] // 2
+        return cls(par[:n], par[n:2*n], par[-4], par[-3], par[-2], par[-1], g, dtype)
+
+    def parameters(self):
+        '''Returns the equivalent parameters list'''
+
+        return list(self.par)
+
+    def astype(self, dtype):
+        '''Returns the same system with masses, lengths, gravity and initial conditions of the given dtype (the system itself if they already are)'''
+
+        if np.dtype(dtype).type is self.dtype:
+            return self
+
+        return PendulumSystem(self.masses, self.lengths, self.q0, self.t0, self.tf, self.nstep, self.g, dtype)
+
+    def __getitem__(self, k):
+        return self.par[k]
+
+    def __len__(self):
+        return len(self.par)
+
+    def __iter__(self):
+        return iter(self.par)
+
+    def __repr__(self):
+        return 'PendulumSystem(n=%d, masses=%s, lengths=%s, g=%g, t0=%s, tf=%s, nstep=%s, dtype=%s)' % (
+            self.n, self.masses.tolist(), self.lengths.tolist(), self.g, self.t0, self.tf, self.nstep, self.dtype.__name__)
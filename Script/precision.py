@@ -0,0 +1,129 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    PRECISION MODULE
+
+    The following code defines the floating point precision policies of the integrators (storage of the trajectories and
+    arithmetic of the steps) and measures the accuracy of the reduced precisions against the float64 reference
+"""
+
+# Python modules
+import sys
+import time
+import argparse
+import numpy as np
+
+# Custom made module
+from pendulumSystem import PendulumSystem
+
+
+# Precision policies: (dtype of the stored trajectory, dtype of the state and of the arithmetic of the steps)
+#   double: float64 everywhere, the default
+#   mixed:  float32 trajectory storage, float64 steps: half the memory of the trajectory, accuracy of a float64 integration
+#   single: float32 everywhere: half the memory and memory bandwidth of the steps too, for large ensembles and flip maps
+PRECISIONS = {
+    'double': (np.float64, np.float64),
+    'mixed': (np.float32, np.float64),
+    'single': (np.float32, np.float32),
+    }
+
+
+def precisionPolicy(precision):
+    '''Returns the storage and compute dtypes of a precision policy'''
+
+    if precision not in PRECISIONS:
+        raise ValueError('Precision "%s" not supported, choose one of: %s' % (precision, ', '.join(PRECISIONS)))
+
+    return PRECISIONS[precision]
+
+
+def castParameters(par, dtype):
+    '''Returns a copy of the parameters list with masses, lengths and initial conditions converted to dtype, time constraints unchanged.
+    The equations of motion compute in the dtype of the state and of the parameters, so a single float64 mass would promote a float32 step to float64.
+    A PendulumSystem is returned as a PendulumSystem of the given dtype'''
+
+    if isinstance(par, PendulumSystem):
+        return par.astype(dtype)
+
+    return [np.asarray(p, dtype=dtype) if np.ndim(p) else dtype(p) for p in par[:-3]] + list(par[-3:])
+
+
+def accuracyReport(f, par, precisions=('mixed', 'single'), threshold=1e-3):
+    '''Integrates the system of par with RungeKutta4 in double precision and in each of the other precisions, comparing them with the float64 reference.
+    Returns a dictionary with, for each precision: maximum and final angle error (rad), time at which the angle error first exceeds threshold
+    (None if never), relative energy drift, bytes of the trajectory and integration time'''
+
+    from rungeKutta4 import RungeKutta4
+    from computeEnergy import chainEnergy
+
+    n = len(par[-4]) // 2
+    masses = par[:n]
+    lengths = par[n:2*n]
+
+    report = {}
+    for precision in ('double', *precisions):
+        start = time.perf_counter()
+        q, t, h = RungeKutta4(f, par, precision=precision)
+        elapsed = time.perf_counter() - start
+
+        # Energies of the trajectory, always computed in float64
+        E, U, T = chainEnergy(q, masses, lengths)
+
+        if precision == 'double':
+            reference = q
+
+        # Angle errors against the reference
+        error = np.amax(np.abs(q[:, ::2] - reference[:, ::2]), axis=1)
+        above = np.flatnonzero(error > threshold)
+
+        report[precision] = {
+            'max_angle_error': float(np.amax(error)),
+            'final_angle_error': float(error[-1]),
+            'divergence_time': float(t[above[0]]) if len(above) else None,
+            'energy_drift': float(np.amax(np.abs(T - T[0])) / max(abs(T[0]), 1e-12)),
+            'trajectory_bytes': q.nbytes,
+            'seconds': elapsed
+            }
+
+    return report
+
+
+def main(argv=None):
+    '''Prints the accuracy report of the precision policies on a simple, double or triple pendulum'''
+
+    from equationsMotion import simplePendulumEq, doublePendulumEq, triplePendulumEq
+
+    parser = argparse.ArgumentParser(description='Accuracy of the float32 precision policies against the float64 reference')
+    parser.add_argument('-n', '--system', type=int, choices=[1, 2, 3], default=3, help='number of segments')
+    parser.add_argument('--theta', type=float, default=135, help='initial angle of every segment (deg)')
+    parser.add_argument('--tf', type=int, default=10, help='ending time (s)')
+    parser.add_argument('--nstep', type=int, default=10000, help='number of iterations')
+    parser.add_argument('--threshold', type=float, default=1e-3, help='angle error (rad) defining the divergence time')
+    args = parser.parse_args(argv)
+
+    n = args.system
+    q0 = np.zeros(2*n)
+    q0[::2] = np.radians(args.theta)
+    par = [*np.ones(2*n), q0, 0, args.tf, args.nstep]
+    f = {1: simplePendulumEq, 2: doublePendulumEq, 3: triplePendulumEq}[n]
+
+    report = accuracyReport(f, par, threshold=args.threshold)
+
+    print('%-8s %14s %14s %14s %14s %10s %9s' % ('policy', 'max error', 'final error', 'diverges at', 'energy drift', 'MB', 'time (s)'))
+    for precision, result in report.items():
+        print('%-8s %14.3e %14.3e %14s %14.3e %10.2f %9.3f' % (
+            precision, result['max_angle_error'], result['final_angle_error'],
+            '%.3f s' % result['divergence_time'] if result['divergence_time'] is not None else '-',
+            result['energy_drift'], result['trajectory_bytes'] / 2**20, result['seconds']))
+
+    return 0
+
+
+# Call the main function when running the script
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    PROFILING MODULE
+
+    The following code instruments the stages of a run (integrators, equations of motion, energy, coordinates, animation callbacks),
+    recording call counts, wall time and memory allocations of each stage. It is disabled by default, when it only costs a flag check per call
+"""
+
+# Python modules
+import json
+import time
+import functools
+import tracemalloc
+
+
+class ProfilerState:
+    '''State of the profiler: recorded statistics and trace events, and the stack of the stages currently running'''
+
+    def __init__(self):
+        self.enabled = False
+        self.allocations = False
+        self.startedTracing = False
+        self.maxEvents = 1000000
+        self.reset()
+
+    def reset(self):
+        self.stats = {}
+        self.events = []
+        self.dropped = 0
+        self.stack = []
+        self.origin = time.perf_counter()
+
+
+# Single profiler of the process
+state = ProfilerState()
+
+
+def profiled(name):
+    '''Decorator recording the calls of the decorated function as the stage name, when the profiler is enabled'''
+
+    def decorator(f):
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+
+            # Disabled profiler: just call the function
+            if not state.enabled:
+                return f(*args, **kwargs)
+
+            # Stage frame: start time, time spent in nested stages, memory at the start and highest memory reached
+            frame = [time.perf_counter(), 0.0, 0, 0]
+            if state.allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                if state.stack:
+                    state.stack[-1][3] = max(state.stack[-1][3], peak)
+                tracemalloc.reset_peak()
+                frame[2] = frame[3] = current
+            state.stack.append(frame)
+
+            try:
+                return f(*args, **kwargs)
+
+            finally:
+                end = time.perf_counter()
+                state.stack.pop()
+                elapsed = end - frame[0]
+
+                # Statistics of the stage: calls, cumulative time, self time (excluding nested stages)
+                stats = state.stats.get(name)
+                if stats is None:
+                    stats = state.stats[name] = {'calls': 0, 'total_s': 0.0, 'self_s': 0.0, 'net_bytes': 0, 'peak_bytes': 0}
+                stats['calls'] += 1
+                stats['total_s'] += elapsed
+                stats['self_s'] += elapsed - frame[1]
+                if state.stack:
+                    state.stack[-1][1] += elapsed
+
+                # Memory retained by the call and highest temporary memory above the memory at its start
+                if state.allocations:
+                    current, peak = tracemalloc.get_traced_memory()
+                    frame[3] = max(frame[3], peak)
+                    stats['net_bytes'] += current - frame[2]
+                    stats['peak_bytes'] = max(stats['peak_bytes'], frame[3] - frame[2])
+                    if state.stack:
+                        state.stack[-1][3] = max(state.stack[-1][3], frame[3])
+
+                # Complete event of the Chrome trace format
+                if len(state.events) < state.maxEvents:
+                    state.events.append((name, frame[0] - state.origin, elapsed))
+                else:
+                    state.dropped += 1
+
+        return wrapper
+
+    return decorator
+
+
+def enable(allocations=False, maxEvents=1000000):
+    '''Starts recording; with allocations the memory of each stage is traced too (slower)'''
+
+    state.reset()
+    state.allocations = allocations
+    state.maxEvents = maxEvents
+    # Start tracing the memory only if nobody else is tracing it, and remember it so that disable() only stops its own tracing
+    if allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        state.startedTracing = True
+    state.enabled = True
+
+
+def disable():
+    '''Stops recording, keeping the recorded data. The memory tracing is stopped only if enable() started it'''
+
+    state.enabled = False
+    if state.startedTracing:
+        tracemalloc.stop()
+        state.startedTracing = False
+
+
+def report():
+    '''Returns the recorded statistics of each stage, sorted by cumulative time'''
+
+    stages = sorted(state.stats.items(), key=lambda item: -item[1]['total_s'])
+    return {
+        'stages': {name: dict(stats, mean_us=1e6 * stats['total_s'] / stats['calls']) for name, stats in stages},
+        'allocations': state.allocations,
+        'events': len(state.events),
+        'dropped_events': state.dropped
+        }
+
+
+def printReport():
+    '''Prints the recorded statistics as a table'''
+
+    print('%-40s %10s %11s %11s %10s %12s' % ('stage', 'calls', 'total (s)', 'self (s)', 'mean (us)', 'peak (MB)'))
+    for name, stats in report()['stages'].items():
+        print('%-40s %10d %11.4f %11.4f %10.2f %12s' % (
+            name, stats['calls'], stats['total_s'], stats['self_s'], stats['mean_us'],
+            '%.2f' % (stats['peak_bytes'] / 2**20) if state.allocations else '-'))
+
+
+def saveReport(fname):
+    '''Writes the recorded statistics to a JSON file'''
+
+    with open(fname, 'w') as file:
+        json.dump(report(), file, indent=1)
+
+
+def saveTrace(fname):
+    '''Writes the recorded calls to a file in the Chrome trace format, readable by chrome://tracing, Perfetto and speedscope'''
+
+    events = [{'name': name, 'ph': 'X', 'ts': 1e6 * start, 'dur': 1e6 * duration, 'pid': 0, 'tid': 0} for name, start, duration in state.events]
+    with open(fname, 'w') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+
+class profilingSession:
+    '''Context manager recording the stages run inside it: with profilingSession(): ...'''
+
+    def __init__(self, allocations=False, maxEvents=1000000):
+        self.allocations = allocations
+        self.maxEvents = maxEvents
+
+    def __enter__(self):
+        enable(self.allocations, self.maxEvents)
+        return state
+
+    def __exit__(self, *exc):
+        disable()
@@ -11,12 +11,82 @@
     The following code is a simple implementation of the Runge-Kutta 4 iterative method
 """
 
-# Python module
+# Python modules
+import inspect
 import numpy as np 
 
+# Custom made modules
+from profiling import profiled
+from precision import precisionPolicy, castParameters
 
-def RungeKutta4(f, par):
-    '''Runge-Kutta 4: the algorithm asks for the function f, which is the callable equation of motion function, and the list of parameters of the system'''
+
+def inPlace(f):
+    '''Returns the equation of motion f with the f(q, t, par, out) contract, writing its result into out:
+    f itself if it accepts out (as the equationsMotion.py functions), otherwise a wrapper copying its result into out'''
+
+    if 'out' in inspect.signature(f).parameters:
+        return f
+
+    def g(q, t, par, out):
+        out[...] = f(q, t, par)
+        return out
+
+    return g
+
+
+def stageBuffers(shape, dtype):
+    '''Preallocated buffers of stepInPlace(), arrays of the shape and dtype of the state: the four stages, the intermediate state and the increment'''
+
+    return tuple(np.empty(shape, dtype=dtype) for k in range(6))
+
+
+def stepInPlace(f, q, t, h, par, buffers):
+    '''Advances the state q from t to t+h in place with a Runge-Kutta 4 step, without allocating any array:
+    f follows the f(q, t, par, out) contract (see inPlace()) and buffers come from stageBuffers().
+    The operations are the same, in the same order, of the step of RungeKutta4, so the results are identical'''
+
+    k1, k2, k3, k4, s, dq = buffers
+
+    # k1 = h * f(q, t), s = q + 0.5 * k1
+    f(q, t, par, k1)
+    k1 *= h
+    np.multiply(k1, 0.5, out=s)
+    s += q
+
+    # k2 = h * f(q + 0.5 * k1, t + 0.5*h), s = q + 0.5 * k2
+    f(s, t + 0.5*h, par, k2)
+    k2 *= h
+    np.multiply(k2, 0.5, out=s)
+    s += q
+
+    # k3 = h * f(q + 0.5 * k2, t + 0.5*h), s = q + k3
+    f(s, t + 0.5*h, par, k3)
+    k3 *= h
+    np.add(q, k3, out=s)
+
+    # k4 = h * f(q + k3, t + h)
+    f(s, t + h, par, k4)
+    k4 *= h
+
+    # q = q + (k1 + 2*(k2 + k3) + k4) / 6
+    np.add(k2, k3, out=dq)
+    dq *= 2
+    dq += k1
+    dq += k4
+    dq /= 6
+    q += dq
+
+    return q
+
+
+@profiled('rungeKutta4.RungeKutta4')
+def RungeKutta4(f, par, precision='double'):
+    '''Runge-Kutta 4: the algorithm asks for the function f, which is the callable equation of motion function, and the list of parameters of the system.
+    precision is one of the policies of the precision.py module: 'double', 'mixed' (float32 trajectory, float64 steps) or 'single' (float32 everywhere)'''
+
+    # Dtypes of the trajectory and of the steps, parameters converted to the dtype of the steps
+    storage, compute = precisionPolicy(precision)
+    par = castParameters(par, compute)
 
     # Unpack initial conditions
     q0 = par[-4]
@@ -31,14 +101,94 @@ def RungeKutta4(f, par):
     h = t[1]-t[0]
 
     # Initialize the solution array
-    q = np.array((int(n)+1)*[q0])
-    
-    # Fill the solution array using the RungeKutta 4 iterative method
+    q = np.empty((int(n)+1, len(q0)), dtype=storage)
+    q[0] = q0
+
+    # Fill the solution array using the RungeKutta 4 iterative method, the current state qi is kept in the dtype of the steps
+    # and advanced in place, reusing the same stage buffers at every step
+    f = inPlace(f)
+    qi = np.array(q0, dtype=compute)
+    hc = compute(h)
+    buffers = stageBuffers(qi.shape, compute)
     for i in range(int(n)):
-        k1 = h * f(q[i], t[i], par)
-        k2 = h * f(q[i] + 0.5 * k1, t[i] + 0.5*h, par)
-        k3 = h * f(q[i] + 0.5 * k2, t[i] + 0.5*h, par)
-        k4 = h * f(q[i] + k3, t[i] + h, par)
-        q[i+1] = q[i] + (k1 + 2*(k2 + k3) + k4) / 6
+        stepInPlace(f, qi, t[i], hc, par, buffers)
+        q[i+1] = qi
+
+    return q, t, h
+
+@profiled('rungeKutta4.RungeKutta4Ensemble')
+def RungeKutta4Ensemble(f, par, precision='double'):
+    '''Runge-Kutta 4 over an ensemble: the initial conditions in par are a (batch, 2n) array and every mass/length can be a (batch,) array, the whole ensemble is advanced by a single vectorized step.
+    precision is one of the policies of the precision.py module, as in RungeKutta4'''
+
+    # Dtypes of the trajectory and of the steps, parameters converted to the dtype of the steps
+    storage, compute = precisionPolicy(precision)
+    par = castParameters(par, compute)
+
+    # Unpack the ensemble initial conditions, one row per member
+    q0 = np.atleast_2d(par[-4])
+
+    # Unpack time conditions and number of iterations
+    t0 = par[-3]
+    tf = par[-2]
+    n  = par[-1]
+
+    # Make the time grid
+    t = np.linspace(int(t0), int(tf), int(n)+1)
+    h = t[1]-t[0]
+
+    # Initialize the solution array: (time, member, coordinate)
+    q = np.empty((int(n)+1, *q0.shape), dtype=storage)
+    q[0] = q0
+
+    # Fill the solution array, each stage evaluates the equation of motion on the whole ensemble at once (current state qi in the dtype of the steps, advanced in place)
+    f = inPlace(f)
+    qi = np.array(q0, dtype=compute)
+    hc = compute(h)
+    buffers = stageBuffers(qi.shape, compute)
+    for i in range(int(n)):
+        stepInPlace(f, qi, t[i], hc, par, buffers)
+        q[i+1] = qi
+
+    return q, t, h
+
+
+def RungeKutta4Stream(f, par, chunk=10000, precision='double'):
+    '''Runge-Kutta 4 as a generator: same arguments of RungeKutta4, but instead of holding the whole trajectory it yields (t, q) chunks of at most chunk time instants'''
+
+    # Dtypes of the chunks and of the steps, parameters converted to the dtype of the steps
+    storage, compute = precisionPolicy(precision)
+    par = castParameters(par, compute)
+
+    # Unpack initial conditions
+    q0 = par[-4]
+
+    # Unpack time conditions and number of iterations
+    t0 = par[-3]
+    tf = par[-2]
+    n  = par[-1]
+
+    # Time step of the same time grid of RungeKutta4
+    h = (int(tf) - int(t0)) / int(n)
+    hc = compute(h)
+
+    # Current state, advanced in place by each step
+    f = inPlace(f)
+    qi = np.array(q0, dtype=compute)
+    buffers = stageBuffers(qi.shape, compute)
+
+    # Produce the trajectory one chunk at a time, the first chunk starts with the initial conditions
+    for start in range(0, int(n)+1, chunk):
+        stop = min(start + chunk, int(n)+1)
+
+        # Time instants and solution array of the chunk
+        t = int(t0) + h * np.arange(start, stop)
+        q = np.empty((stop - start, len(qi)), dtype=storage)
+
+        for i in range(stop - start):
+            # The initial conditions are not a step
+            if start + i > 0:
+                stepInPlace(f, qi, t[i] - h, hc, par, buffers)
+            q[i] = qi
 
-    return q, t, h
\ No newline at end of file
+        yield t, q
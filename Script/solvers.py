@@ -0,0 +1,51 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    SOLVERS MODULE
+
+    The following code lets the simulations choose the integration method of the equations of motion
+"""
+
+# Custom made modules
+from rungeKutta4 import RungeKutta4
+from dormandPrince import DormandPrince45
+from variationalIntegrator import ImplicitMidpoint
+from compiledBackend import RungeKutta4Compiled
+from profiling import profiled
+
+
+# Names of the available integration methods
+SOLVERS = {
+    'rk4': 'Runge-Kutta 4 (fixed step)',
+    'rk4c': 'Runge-Kutta 4 with the compiled backend (Numba if installed)',
+    'dp45': 'Dormand-Prince 5(4) (adaptive step)',
+    'midpoint': 'Symplectic implicit midpoint (bounded energy error)'
+    }
+
+
+@profiled('solvers.solveMotion')
+def solveMotion(f, n, par, solver='rk4'):
+    '''Integrates the equation of motion f of the system made of n segments with the chosen solver, returns q, t and h'''
+
+    # Fixed step Runge-Kutta 4 method
+    if solver == 'rk4':
+        return RungeKutta4(f, par)
+
+    # Fixed step Runge-Kutta 4 method with compiled equations of motion
+    elif solver == 'rk4c':
+        return RungeKutta4Compiled(n, par)
+
+    # Adaptive step Dormand-Prince method
+    elif solver == 'dp45':
+        return DormandPrince45(f, par)
+
+    # Symplectic method, it builds the equations of motion from the Lagrangian of the system
+    elif solver == 'midpoint':
+        return ImplicitMidpoint(n, par)
+
+    raise ValueError('Solver "%s" not supported, choose one of: %s' % (solver, ', '.join(SOLVERS)))
@@ -0,0 +1,244 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    TRAJECTORY STORE MODULE
+
+    The following code saves a simulation on disk in compressed chunks and reads it back lazily,
+    so that a run can be plotted again without integrating it again
+"""
+
+# Python modules
+import os
+import json
+from functools import lru_cache
+import numpy as np
+
+
+# Arrays saved for each run, in the same layout returned by RungeKutta4, computeCoordinates and computeEnergy
+VARIABLES = ('t', 'q', 'x', 'y', 'E', 'U', 'T')
+
+# Version of the store layout
+STORE_FORMAT = 1
+
+
+class TrajectoryWriter:
+    '''Writes a run to the directory path one chunk at a time: each chunk is a compressed .npz file, the parameters go to meta.json'''
+
+    def __init__(self, path, n, par):
+
+        # Create the run directory
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        # Metadata of the run: type of system, parameters list and chunk lengths
+        self.meta = {
+            'format': STORE_FORMAT,
+            'n': int(n),
+            'masses_lengths': [float(p) for p in par[:2*n]],
+            'q0': np.asarray(par[-4], dtype=float).tolist(),
+            't0': float(par[-3]),
+            'tf': float(par[-2]),
+            'nstep': int(par[-1]),
+            'variables': [],
+            'chunks': []
+            }
+
+    def write(self, **arrays):
+        '''Appends a chunk: the keyword arguments are the arrays of the chunk (t, q, x, y, E, U, T), all with the same number of time instants'''
+
+        # Check the names and the lengths of the arrays
+        names = [name for name in VARIABLES if name in arrays]
+        if len(names) != len(arrays):
+            raise ValueError('Unknown variables: %s' % ', '.join(set(arrays) - set(VARIABLES)))
+        if not self.meta['chunks']:
+            self.meta['variables'] = names
+        elif names != self.meta['variables']:
+            raise ValueError('Every chunk must hold the variables %s' % ', '.join(self.meta['variables']))
+        length = len(arrays[names[0]])
+        if any(len(arrays[name]) != length for name in names):
+            raise ValueError('All the arrays of a chunk must have the same length')
+
+        # Save the compressed chunk
+        fname = os.path.join(self.path, 'chunk_%06d.npz' % len(self.meta['chunks']))
+        np.savez_compressed(fname, **arrays)
+        self.meta['chunks'].append(length)
+
+    def close(self):
+        '''Writes the metadata, making the run readable'''
+
+        with open(os.path.join(self.path, 'meta.json'), 'w') as file:
+            json.dump(self.meta, file, indent=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+
+        # A run interrupted by an exception is left without metadata, so that it is never read back as complete
+        if exc[0] is None:
+            self.close()
+
+
+class LazyArray:
+    '''Array of a stored run that loads from disk only the chunks needed by each indexing operation'''
+
+    def __init__(self, reader, name):
+        self.reader = reader
+        self.name = name
+
+        # Shape and type of the whole array, from the first chunk
+        if reader.length == 0:
+            raise ValueError('The run in %s holds no chunks' % reader.path)
+        first = reader.loadChunk(0)[name]
+        self.shape = (reader.length,) + first.shape[1:]
+        self.dtype = first.dtype
+        self.ndim = len(self.shape)
+
+        # Time instants already read by head(), kept in memory
+        self.loaded = None
+        self.loadedLength = 0
+
+    def __len__(self):
+        return self.shape[0]
+
+    def chunks(self):
+        '''Iterates over the chunks of the array'''
+
+        for k in range(len(self.reader.offsets) - 1):
+            yield self.reader.loadChunk(k)[self.name]
+
+    def __getitem__(self, index):
+
+        # Split the index into the time index and the index of the other axes
+        if not isinstance(index, tuple):
+            index = (index,)
+        first, rest = index[0], index[1:]
+        offsets = self.reader.offsets
+
+        # Single time instant: load only the chunk holding it
+        if isinstance(first, (int, np.integer)):
+            i = first + len(self) if first < 0 else first
+            if not 0 <= i < len(self):
+                raise IndexError('Index %d out of range' % first)
+            k = np.searchsorted(offsets, i, side='right') - 1
+            return self.reader.loadChunk(k)[self.name][(i - offsets[k],) + rest]
+
+        # Ellipsis or new axis first: load the whole array
+        if first is Ellipsis or first is None:
+            return self[:][index]
+
+        # Integer or boolean array of time instants: load only the chunks holding them
+        if not isinstance(first, slice):
+            return self.take(first)[(slice(None),) * np.ndim(first) + rest]
+
+        # Range of time instants: load only the chunks overlapping it
+        start, stop, step = first.indices(len(self))
+        if step != 1:
+            return self[start:stop][(slice(None, None, step),) + rest]
+        if stop <= start:
+            return np.empty((0,) + self.shape[1:], dtype=self.dtype)[(slice(None),) + rest]
+        parts = []
+        for k in range(np.searchsorted(offsets, start, side='right') - 1, len(offsets) - 1):
+            if offsets[k] >= stop:
+                break
+            a = max(start, offsets[k]) - offsets[k]
+            b = min(stop, offsets[k+1]) - offsets[k]
+            parts.append(self.reader.loadChunk(k)[self.name][(slice(a, b),) + rest])
+        return np.concatenate(parts)
+
+    def head(self, stop):
+        '''Returns the first stop time instants. The instants read are kept in memory and only the new ones are read from disk,
+        so that growing prefixes, such as the trends drawn by the animations, read each chunk only once'''
+
+        stop = min(max(stop, 0), len(self))
+        if self.loaded is None:
+            self.loaded = np.empty(self.shape, dtype=self.dtype)
+        if stop > self.loadedLength:
+            self.loaded[self.loadedLength:stop] = self[self.loadedLength:stop]
+            self.loadedLength = stop
+
+        return self.loaded[:stop]
+
+    def take(self, indices):
+        '''Returns the time instants of an integer or boolean array of indices, loading only the chunks holding them'''
+
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            if indices.shape != (len(self),):
+                raise IndexError('Boolean index of shape %s does not match the %d time instants' % (indices.shape, len(self)))
+            indices = np.flatnonzero(indices)
+        elif not np.issubdtype(indices.dtype, np.integer):
+            raise IndexError('Only integers, slices, Ellipsis and integer or boolean arrays are valid indices, got %r' % (indices,))
+
+        # Wrap the negative indices and check the range
+        indices = np.where(indices < 0, indices + len(self), indices)
+        if np.any((indices < 0) | (indices >= len(self))):
+            raise IndexError('Index out of range for %d time instants' % len(self))
+
+        # Fill the result chunk by chunk
+        offsets = self.reader.offsets
+        chunks = np.searchsorted(offsets, indices, side='right') - 1
+        result = np.empty(indices.shape + self.shape[1:], dtype=self.dtype)
+        for k in np.unique(chunks):
+            selected = chunks == k
+            result[selected] = self.reader.loadChunk(k)[self.name][indices[selected] - offsets[k]]
+
+        return result
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[:], dtype=dtype)
+
+
+class TrajectoryReader:
+    '''Opens a run written by TrajectoryWriter: the arrays are available as lazy arrays, e.g. reader['q'], and the parameters list as reader.par'''
+
+    def __init__(self, path, cachedChunks=8):
+        self.path = path
+
+        # Read the metadata
+        with open(os.path.join(path, 'meta.json')) as file:
+            self.meta = json.load(file)
+        if self.meta['format'] != STORE_FORMAT:
+            raise ValueError('Unsupported store format %s' % self.meta['format'])
+
+        # Rebuild the parameters list of the run
+        self.n = self.meta['n']
+        self.par = [*self.meta['masses_lengths'], np.array(self.meta['q0']), self.meta['t0'], self.meta['tf'], self.meta['nstep']]
+
+        # First time instant of each chunk
+        self.offsets = np.concatenate(([0], np.cumsum(self.meta['chunks']))).astype(int)
+        self.length = int(self.offsets[-1])
+
+        # Keep the most recently used chunks in memory
+        self.loadChunk = lru_cache(maxsize=cachedChunks)(self.readChunk)
+
+    def readChunk(self, k):
+        '''Reads the k-th chunk from disk'''
+
+        with np.load(os.path.join(self.path, 'chunk_%06d.npz' % k)) as data:
+            return {name: data[name] for name in data.files}
+
+    def __getitem__(self, name):
+        if not self.meta['chunks']:
+            raise ValueError('The run in %s holds no chunks' % self.path)
+        if name not in self.meta['variables']:
+            raise KeyError(name)
+        return LazyArray(self, name)
+
+    def __contains__(self, name):
+        return name in self.meta['variables']
+
+
+def writeRun(path, n, par, stream, energy, coordinates):
+    '''Writes a whole run to path from a stream of (t, q) chunks, such as RungeKutta4Stream, computing energies and coordinates chunk by chunk'''
+
+    with TrajectoryWriter(path, n, par) as writer:
+        for t, q in stream:
+            E, U, T = energy(q, par)
+            x, y = coordinates(n, q, par)
+            writer.write(t=t, q=q, x=x, y=y, E=E, U=U, T=T)
@@ -0,0 +1,262 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    VARIATIONAL INTEGRATOR MODULE
+
+    The following code is a symplectic implicit midpoint integrator for a pendulum made of n segments,
+    built on the same Lagrangian of integrate_pendulum() in LagrangesEquations/TriplePendulum_Code.py,
+    and checks that its energy error stays bounded at a time step at which the one of Runge-Kutta 4 drifts
+"""
+
+# Python modules
+import sys
+import argparse
+import numpy as np
+
+# Custom made module
+from pendulumSystem import PendulumSystem, chainMasses, massMatrix
+
+
+# The Lagrangian of a chain of n point masses hanging from rigid ropes is
+#   L = 1/2 * omega^T M(theta) omega + g * sum_i mu_ii * l_i * cos(theta_i)
+# with the mass matrix M_ij = mu_ij * l_i * l_j * cos(theta_i - theta_j)
+# and mu_ij the sum of the masses hanging below both rope i and rope j.
+# The integrator works with the conjugate momenta p = M(theta) omega, in which the midpoint rule is symplectic:
+# the energy error stays bounded over arbitrarily long runs instead of drifting as with RungeKutta4.
+
+
+def hamiltonField(z, mu, l, g):
+    '''Hamilton equations of the chain: z holds the angles followed by the conjugate momenta'''
+
+    # Unpack angles and momenta
+    n = len(l)
+    theta = z[:n]
+    p = z[n:]
+
+    # Angular velocities from the momenta
+    omega = np.linalg.solve(massMatrix(theta, mu, l), p)
+
+    # Derivative of the Hamiltonian with respect to the angles
+    lo = l * omega
+    pd = -lo * ((mu * np.sin(np.subtract.outer(theta, theta))) @ lo) - g * np.diag(mu) * l * np.sin(theta)
+
+    return np.concatenate((omega, pd)), omega
+
+
+def hamiltonJacobian(z, mu, l, g):
+    '''Hamilton equations of the chain and their Jacobian with respect to z, computed analytically'''
+
+    # Unpack angles and momenta
+    n = len(l)
+    theta = z[:n]
+    p = z[n:]
+
+    # Angular velocities from the momenta, through the inverse mass matrix which is also part of the Jacobian
+    Minv = np.linalg.inv(massMatrix(theta, mu, l))
+    omega = Minv @ p
+    lo = l * omega
+
+    # Sines and cosines of the angle differences weighted by the masses, and the forces of the ropes
+    dtheta = np.subtract.outer(theta, theta)
+    muS = mu * np.sin(dtheta)
+    muC = mu * np.cos(dtheta)
+    a = muS @ lo
+    b = muC @ lo
+
+    # Derivative of the Hamiltonian with respect to the angles
+    pd = -lo * a - g * np.diag(mu) * l * np.sin(theta)
+
+    # Derivatives of the angular velocities: with respect to the angles (through the mass matrix) and to the momenta
+    D = muS * np.outer(l, lo) - np.diag(l * a)
+    Wt = -Minv @ D
+
+    # Derivatives of the momenta: with respect to the angles at fixed velocities, and to the velocities
+    Pt = lo[:, None] * muC * lo - np.diag(lo * b + g * np.diag(mu) * l * np.cos(theta))
+    Pw = -muS * np.outer(lo, l) - np.diag(l * a)
+
+    J = np.block([[Wt, Minv], [Pt + Pw @ Wt, Pw @ Minv]])
+
+    return np.concatenate((omega, pd)), J
+
+
+def midpointStep(z, h, rate, mu, l, g, tol, maxiter):
+    '''Single implicit midpoint step of size h from the canonical state z, predicted with the mean derivative rate of the previous step.
+    Returns the new state, or None if the Newton iterations do not converge'''
+
+    # Predict the new state by continuing the previous step
+    zn = z + h * rate
+
+    # Jacobian of the residual zn - z - h * F((z + zn)/2), with the analytic Jacobian of the Hamilton equations
+    # at the predicted midpoint, factored once and kept fixed during the iterations (simplified Newton)
+    F, J = hamiltonJacobian(0.5 * (z + zn), mu, l, g)
+    Ginv = np.linalg.inv(np.eye(len(z)) - 0.5 * h * J)
+
+    # Solve the implicit midpoint equation zn = z + h * F((z + zn)/2) with Newton iterations
+    previous = np.inf
+    for k in range(maxiter):
+        if k:
+            F, _ = hamiltonField(0.5 * (z + zn), mu, l, g)
+        dzn = Ginv @ (zn - z - h * F)
+        zn = zn - dzn
+
+        # Give up as soon as the iterations stop contracting, before they blow up
+        size = np.amax(np.abs(dzn))
+        if not size < previous:
+            return None
+        previous = size
+
+        # Stop when the Newton correction is negligible
+        if size < tol * (1 + np.amax(np.abs(zn))):
+            return zn
+
+    return None
+
+
+def symplecticStep(z, h, rate, mu, l, g, order, tol, maxiter, depth=0):
+    '''Symplectic step of size h: a single implicit midpoint step (order 2) or the triple jump composition of three of them (order 4).
+    rate is the mean derivative of the previous step, used to predict the new state. Returns the new state and its own mean derivative.
+    If the Newton iterations do not converge the step is split in two halves'''
+
+    # Triple jump coefficients (Yoshida): the three substeps of size c1*h, c2*h, c1*h cancel the 3rd order error
+    if order == 4:
+        c1 = 1 / (2 - 2**(1/3))
+        c2 = 1 - 2*c1
+        substeps = [c1*h, c2*h, c1*h]
+    else:
+        substeps = [h]
+
+    zn = z
+    rn = rate
+    for hs in substeps:
+        zs = midpointStep(zn, hs, rn, mu, l, g, tol, maxiter)
+        if zs is None:
+            zn = None
+            break
+        rn = (zs - zn) / hs
+        zn = zs
+
+    # Retry with two half steps if the implicit equations could not be solved
+    if zn is None:
+        if depth >= 10:
+            raise RuntimeError('Implicit midpoint iterations did not converge, try with a smaller time step')
+        zn, rn = symplecticStep(z, 0.5*h, rate, mu, l, g, order, tol, maxiter, depth+1)
+        zn, rn = symplecticStep(zn, 0.5*h, rn, mu, l, g, order, tol, maxiter, depth+1)
+
+    return zn, rn
+
+
+def ImplicitMidpoint(n, par, order=2, tol=1e-12, maxiter=20):
+    '''Implicit midpoint rule: symplectic integrator for the pendulum made of n segments, it takes the parameters list and returns the same q, t and h of RungeKutta4.
+    With order=2 (the default) each step is a single midpoint step, with order=4 it is a triple jump composition of three midpoint steps'''
+
+    if order not in (2, 4):
+        raise ValueError('Order %s not supported, choose 2 or 4' % order)
+
+    # Define relevant parameters, with the gravity of a PendulumSystem
+    g = par.g if isinstance(par, PendulumSystem) else 9.81
+    m = np.array(par[:n], dtype=float)
+    l = np.array(par[n:2*n], dtype=float)
+    mu = chainMasses(m)
+
+    # Unpack initial conditions
+    q0 = np.asarray(par[-4], dtype=float)
+
+    # Unpack time conditions and number of iterations
+    t0 = par[-3]
+    tf = par[-2]
+    nstep = par[-1]
+
+    # Make the time grid
+    t = np.linspace(int(t0), int(tf), int(nstep)+1)
+    h = t[1]-t[0]
+
+    # Initialize the solution array
+    q = np.empty((int(nstep)+1, 2*n))
+    q[0] = q0
+
+    # Initial state in canonical coordinates: angles and conjugate momenta
+    z = np.concatenate((q0[::2], massMatrix(q0[::2], mu, l) @ q0[1::2]))
+
+    # The first step is predicted with the derivative at the initial state, the next ones continue the previous step
+    rate = hamiltonField(z, mu, l, g)[0]
+
+    for i in range(int(nstep)):
+
+        # Advance the canonical state
+        z, rate = symplecticStep(z, h, rate, mu, l, g, order, tol, maxiter)
+
+        # Go back to angles and angular velocities
+        theta = z[:n]
+        q[i+1, ::2] = theta
+        q[i+1, 1::2] = np.linalg.solve(massMatrix(theta, mu, l), z[n:])
+
+    return q, t, h
+
+
+def energyDriftReport(par, orders=(2, 4)):
+    '''Integrates the triple pendulum of par with RungeKutta4 and with the implicit midpoint rule of each order.
+    Returns a dictionary with, for each method, the largest energy error in the first and in the last tenth of the run
+    (relative to the energy scale g * sum of the potential energy weights) and the integration time'''
+
+    import time
+    from rungeKutta4 import RungeKutta4
+    from equationsMotion import triplePendulumEq
+    from computeEnergy import chainEnergy
+
+    masses = par[:3]
+    lengths = par[3:6]
+    scale = 9.81 * np.sum(np.diag(chainMasses(masses)) * np.asarray(lengths, dtype=float))
+
+    methods = {'rk4': lambda: RungeKutta4(triplePendulumEq, par)}
+    for order in orders:
+        methods['midpoint-%d' % order] = lambda order=order: ImplicitMidpoint(3, par, order)
+
+    report = {}
+    for name, method in methods.items():
+        start = time.perf_counter()
+        q, t, h = method()
+        elapsed = time.perf_counter() - start
+
+        # Energy error along the run, in the first and in the last tenth
+        E, U, T = chainEnergy(q, masses, lengths)
+        error = np.abs(T - T[0]) / scale
+        tenth = max(len(error) // 10, 1)
+
+        report[name] = {'first_error': float(np.amax(error[:tenth])), 'last_error': float(np.amax(error[-tenth:])), 'seconds': elapsed}
+
+    return report
+
+
+def main(argv=None):
+    '''Checks that the energy error of the implicit midpoint rule stays bounded at a time step at which the one of RungeKutta4 drifts.
+    Returns 1 if the error of a midpoint method in the last tenth of the run is more than twice the one in the first tenth'''
+
+    parser = argparse.ArgumentParser(description='Energy drift of the implicit midpoint rule against RungeKutta4 on a triple pendulum')
+    parser.add_argument('--theta', type=float, default=60, help='initial angle of every segment (deg)')
+    parser.add_argument('--tf', type=int, default=200, help='ending time (s)')
+    parser.add_argument('--nstep', type=int, default=2000, help='number of iterations')
+    args = parser.parse_args(argv)
+
+    q0 = np.zeros(6)
+    q0[::2] = np.radians(args.theta)
+    report = energyDriftReport([1, 1, 1, 1, 1, 1, q0, 0, args.tf, args.nstep])
+
+    print('%-12s %14s %14s %10s' % ('method', 'first tenth', 'last tenth', 'time (s)'))
+    for name, result in report.items():
+        print('%-12s %14.3e %14.3e %10.3f' % (name, result['first_error'], result['last_error'], result['seconds']))
+
+    drifting = [name for name, result in report.items() if name != 'rk4' and result['last_error'] > 2 * result['first_error']]
+    for name in drifting:
+        print('DRIFT %s: the energy error grows along the run' % name)
+
+    return 1 if drifting else 0
+
+
+# Call the main function when running the script
+if __name__ == "__main__":
+    sys.exit(main())
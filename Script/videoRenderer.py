@@ -0,0 +1,136 @@
+"""
+    TRIPLE PENDULUM SCRIPT
+
+    Author: Nicolò Lai
+    Project: Triple Pendulum
+    Goal: Solving the equation of motions of a triple pendulum
+    Means: Runge-Kutta 4 iterative method
+
+    VIDEO RENDERER MODULE
+
+    The following code renders long animations offline: the frames are split into segments rendered by worker processes,
+    each one drawing its frames with the Agg backend and piping the raw pixels to its own ffmpeg encoder, and the segments are then concatenated
+"""
+
+# Python modules
+import os
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+def chainScene(positions, track_length=45, size=6, dpi=100):
+    '''Scene of one or more pendulums, drawn as in animate_pendulums() of LagrangesEquations/TriplePendulum_Code.py.
+    positions is the (npendulums, len(t), n+1, 2) array of the (x, y) coordinates of the points of each pendulum.
+    Returns the figure and the function drawing the time step i on it'''
+
+    import matplotlib.pyplot as plt
+    from matplotlib import collections
+
+    n_pendulums = positions.shape[0]
+
+    # Make figure and axes
+    fig = plt.figure(figsize=(size, size), dpi=dpi)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.axes.xaxis.set_ticks([])
+    ax.axes.yaxis.set_ticks([])
+    reach = np.amax(np.abs(positions)) * 1.05
+    ax.set(xlim=(-reach, reach), ylim=(-reach, reach))
+
+    # Tracks of the last points, pendulum segments and mass points
+    tracks = collections.LineCollection(np.zeros((n_pendulums, 0, 2)), cmap='gist_rainbow')
+    tracks.set_array(np.linspace(0, 1, n_pendulums))
+    ax.add_collection(tracks)
+    pendulums = collections.LineCollection(np.zeros((n_pendulums, 0, 2)), colors='black')
+    ax.add_collection(pendulums)
+    points, = ax.plot([], [], 'ok')
+
+    def update(i):
+        pendulums.set_segments(positions[:, i])
+        tracks.set_segments(positions[:, max(0, i - track_length):i+1, -1])
+        x, y = positions[:, i].reshape(-1, 2).T
+        points.set_data(x, y)
+
+    return fig, update
+
+
+def renderSegment(scene, args, frames, fname, fps, ffmpeg):
+    '''Renders the frames of a segment to the video fname: the scene is built with scene(*args), returning the figure and its update(i) function.
+    Each frame is drawn with the Agg backend and its RGBA buffer is written straight to the standard input of the ffmpeg encoder'''
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, update = scene(*args)
+    canvas = fig.canvas
+    canvas.draw()
+    width, height = canvas.get_width_height(physical=True)
+
+    # Encoder reading raw frames from the pipe (H.264 needs even sizes, so odd sizes are padded)
+    command = [ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', '%dx%d' % (width, height), '-r', str(fps), '-i', '-',
+               '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', 'libx264', '-pix_fmt', 'yuv420p', fname]
+    encoder = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # If ffmpeg exits early the pipe breaks: stop writing and report its own error message below
+    broken = False
+    try:
+        for i in frames:
+            update(i)
+            canvas.draw()
+            encoder.stdin.write(canvas.buffer_rgba())
+    except BrokenPipeError:
+        broken = True
+    finally:
+        try:
+            encoder.stdin.close()
+        except BrokenPipeError:
+            broken = True
+        error = encoder.stderr.read().decode()
+        encoder.wait()
+        plt.close(fig)
+
+    if broken or encoder.returncode != 0:
+        raise RuntimeError('ffmpeg failed on %s: %s' % (fname, error))
+
+    return fname
+
+
+def renderVideo(scene, args, frames, fname, fps=30, workers=None, ffmpeg='ffmpeg'):
+    '''Renders the video fname of the scene built by scene(*args), e.g. chainScene, drawing the time steps in frames (e.g. range(0, len(t), 3)).
+    The frames are split into one contiguous segment per worker process (all the cores by default), the segments are encoded in parallel
+    and then concatenated without encoding them again'''
+
+    frames = list(frames)
+    if not frames:
+        raise ValueError('No frames to render to %s' % fname)
+
+    if shutil.which(ffmpeg) is None:
+        raise FileNotFoundError('The video renderer requires the ffmpeg executable')
+
+    workers = workers or os.cpu_count()
+    segments = [part for part in np.array_split(frames, workers) if len(part)]
+
+    # Segments are written next to the video, in a temporary directory removed at the end
+    folder = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(fname)))
+    try:
+        names = [os.path.join(folder, 'segment_%04d.mp4' % k) for k in range(len(segments))]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(renderSegment, scene, args, part.tolist(), name, fps, ffmpeg) for part, name in zip(segments, names)]
+            for future in futures:
+                future.result()
+
+        # Concatenate the segments with the concat demuxer
+        listing = os.path.join(folder, 'segments.txt')
+        with open(listing, 'w') as file:
+            file.writelines("file '%s'\n" % name for name in names)
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', listing, '-c', 'copy', fname], check=True)
+
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    return fname